@@ -0,0 +1,26 @@
+-- Adds the generated full-text search documents and their GIN indexes to
+-- existing courses and lectures tables (create_all only creates new tables).
+-- Postgres computes search_vector for every existing row while adding it.
+
+ALTER TABLE courses
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+
+ALTER TABLE lectures
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(category, '') || ' ' || coalesce(subcategory, '')), 'C')
+    ) STORED;
+
+-- CONCURRENTLY keeps the tables writable while the indexes build; run these
+-- outside a transaction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_search_vector
+    ON courses USING gin (search_vector);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_lectures_search_vector
+    ON lectures USING gin (search_vector);
@@ -0,0 +1,24 @@
+-- Indexes existing lectures for the category drill-down and backfills the
+-- category_facets aggregate (created by create_all) from them. Rows that
+-- already exist are recomputed from lectures, so the backfill also repairs
+-- drifted counts and is safe to re-run.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_lectures_category_subcategory
+    ON lectures (category, subcategory);
+
+INSERT INTO category_facets (category, subcategory, course_id, lecture_count, total_duration)
+SELECT category, subcategory, course_id, count(*), sum(duration)
+FROM lectures
+GROUP BY category, subcategory, course_id
+ON CONFLICT (category, subcategory, course_id) DO UPDATE
+SET lecture_count = EXCLUDED.lecture_count,
+    total_duration = EXCLUDED.total_duration;
+
+DELETE FROM category_facets AS facet
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM lectures
+    WHERE lectures.category = facet.category
+      AND lectures.subcategory = facet.subcategory
+      AND lectures.course_id = facet.course_id
+);
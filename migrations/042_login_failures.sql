@@ -0,0 +1,11 @@
+-- Shared failed login counters (also created by create_all in development).
+
+CREATE TABLE IF NOT EXISTS login_failures (
+    key VARCHAR(320) PRIMARY KEY,
+    failures INTEGER NOT NULL,
+    locked_until DOUBLE PRECISION NOT NULL,
+    last_failure_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_login_failures_last_failure_at
+    ON login_failures (last_failure_at);
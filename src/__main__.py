@@ -0,0 +1,146 @@
+"""
+Command line entry point.
+
+    python -m src serve --workers 8
+    python -m src import-users students.csv --report report.ndjson
+    python -m src profile-token --ttl 600
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections import Counter
+from typing import Iterator, List, Tuple
+
+
+def _read_records(path: str, file_format: str,
+                  errors: List[dict]) -> Iterator[Tuple[int, dict]]:
+    """Yields (line number, fields) for each user in a CSV or NDJSON file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                errors.append({"line": line, "status": "invalid", "error": f"Invalid JSON: {e}"})
+                continue
+            if not isinstance(record, dict):
+                errors.append({"line": line, "status": "invalid", "error": "Expected a JSON object"})
+                continue
+            yield line, record
+
+
+async def _import_users(args: argparse.Namespace) -> int:
+    from src.configs.database import SessionLocal
+    from src.configs.hashing import password_hasher
+    from src.modules.auth.controller import AuthController
+
+    if args.workers:
+        password_hasher.workers = args.workers
+    file_format = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+
+    parse_errors: List[dict] = []
+    db = SessionLocal()
+    try:
+        await password_hasher.calibrate()
+        results = await AuthController(db).import_users(
+            _read_records(args.file, file_format, parse_errors))
+    finally:
+        db.close()
+        password_hasher.shutdown()
+
+    rows = sorted([result.model_dump(mode="json") for result in results] + parse_errors,
+                  key=lambda row: row["line"])
+    report = open(args.report, "w", encoding="utf-8") if args.report else sys.stdout
+    try:
+        for row in rows:
+            report.write(json.dumps(row) + "\n")
+    finally:
+        if args.report:
+            report.close()
+
+    counts = Counter(row["status"] for row in rows)
+    print(f"Imported {counts['created']} of {len(rows)} users "
+          f"({counts['duplicate']} duplicate, {counts['invalid']} invalid)",
+          file=sys.stderr)
+    return 0 if counts["created"] == len(rows) else 1
+
+
+def _serve(args: argparse.Namespace) -> int:
+    from src.server import ServerOptions, serve
+
+    options = ServerOptions()
+    for name in vars(options):
+        if getattr(args, name, None) is not None:
+            setattr(options, name, getattr(args, name))
+    serve(options)
+    return 0
+
+
+def _profile_token(args: argparse.Namespace) -> int:
+    import time
+    from src.configs.profiler import sign_profile_token
+    from src.configs.settings import settings
+
+    if not settings.profiler_secret:
+        print("PROFILER_SECRET is not set", file=sys.stderr)
+        return 1
+    print(sign_profile_token(int(time.time()) + args.ttl,
+                             settings.profiler_secret))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m src")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser(
+        "serve", help="Run the API with a pre-forked pool of worker processes")
+    serve.add_argument("--host", help="Bind address (default: HOST)")
+    serve.add_argument("--port", type=int, help="Bind port (default: PORT)")
+    serve.add_argument("--workers", type=int,
+                       help="Worker processes (default: SERVER_WORKERS, or the core count)")
+    serve.add_argument("--backlog", type=int, help="Listen backlog (default: SERVER_BACKLOG)")
+    serve.add_argument("--keep-alive", dest="keep_alive", type=int,
+                       help="Idle keep-alive timeout in seconds (default: SERVER_KEEP_ALIVE_SECONDS)")
+    serve.add_argument("--limit-concurrency", dest="limit_concurrency", type=int,
+                       help="Connections per worker before answering 503 (default: SERVER_LIMIT_CONCURRENCY)")
+    serve.add_argument("--max-requests", dest="max_requests", type=int,
+                       help="Requests after which a worker is recycled (default: SERVER_MAX_REQUESTS)")
+    serve.add_argument("--max-requests-jitter", dest="max_requests_jitter", type=int,
+                       help="Random extra requests per worker, so they don't recycle together")
+
+    import_users = commands.add_parser(
+        "import-users", help="Register users in bulk from a CSV or NDJSON file")
+    import_users.add_argument("file", help="CSV with a header row, or one JSON object per line")
+    import_users.add_argument("--format", choices=["csv", "ndjson"],
+                              help="File format (default: from the file extension)")
+    import_users.add_argument("--report", help="Write the per-row NDJSON report here instead of stdout")
+    import_users.add_argument("--workers", type=int,
+                              help="Password hashing processes (default: PASSWORD_HASH_WORKERS)")
+
+    profile_token = commands.add_parser(
+        "profile-token", help="Print a signed X-Profile header value for profiling requests")
+    profile_token.add_argument("--ttl", type=int, default=300,
+                               help="Seconds the token stays valid (default: 300)")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        return _serve(args)
+    if args.command == "import-users":
+        return asyncio.run(_import_users(args))
+    if args.command == "profile-token":
+        return _profile_token(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
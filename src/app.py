@@ -1,38 +1,162 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.errors.app_errors import AppError
-from src.configs.database import engine, Base
+from src.configs.database import engine, Base, SessionLocal
+from src.configs.logger import get_logger
 from src.configs.settings import settings
 from src.configs.limiter import limiter
-from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
+from src.configs.cache import caches
+from src.configs.single_flight import single_flights
+from src.configs.invalidation import invalidation_bus
+from src.configs.hashing import password_hasher
+from src.configs.metrics import registry
+from src.configs.tracing import tracer
+from src.configs.profiler import profiler, ProfilingExecutor
+from src.middlewares.metrics import MetricsMiddleware
+from src.middlewares.tracing import TracingMiddleware
+from src.middlewares.profiler import ProfilerMiddleware
+from src.middlewares.query_stats import QueryStatsMiddleware
+from src.middlewares.rate_limit import RateLimitHeadersMiddleware
 
 # APIs routes
 from src.modules.auth.routes import router as auth_router
 from src.modules.instructor.courses.routes import router as courses_router
 from src.modules.student.subscription.routes import router as subscription_router
+from src.modules.catalog.routes import router as catalog_router
+from src.modules.catalog.controller import CatalogController
+from src.modules.auth.repository import AuthRepository
+from src.modules.auth.utils import token_denylist
+from src.modules.instructor.courses.utils import get_http_client, close_http_client, get_signing_key
+
+logger = get_logger(__name__)
+
+
+def build_title_index():
+    # Build the autocomplete index; autocomplete stays empty if the DB is unreachable
+    db = SessionLocal()
+    try:
+        CatalogController(db).load_title_index()
+    except Exception:
+        logger.exception("Failed to build the course title index")
+    finally:
+        db.close()
+
+
+def build_token_denylist():
+    # Mirror the revoked access tokens, so Auth never queries for them
+    db = SessionLocal()
+    try:
+        token_denylist.load(AuthRepository(db).get_revoked_tokens())
+    except Exception:
+        logger.exception("Failed to load the token denylist")
+    finally:
+        db.close()
+
+
+def reload_title_index():
+    # Called by the invalidation listener on the event loop; rebuild off it
+    asyncio.get_running_loop().run_in_executor(None, build_title_index)
+
+
+def reload_token_denylist():
+    asyncio.get_running_loop().run_in_executor(None, build_token_denylist)
+
+
+# Reload the index and denylist in the background if events were missed.
+# Registered once here, since the lifespan may run more than once per process
+invalidation_bus.on_reset(reload_title_index)
+invalidation_bus.on_reset(reload_token_denylist)
+
+
+def warm_db_pool():
+    # Open the pool's connections up front instead of on the first requests
+    try:
+        connections = [engine.connect() for _ in range(engine.pool.size())]
+        for connection in connections:
+            connection.close()
+    except Exception:
+        logger.exception("Failed to warm the database pool")
+
+
+async def write_metrics_snapshots():
+    # Publish this worker's samples for whichever worker serves the scrape
+    while True:
+        await asyncio.sleep(settings.metrics_snapshot_interval_seconds)
+        try:
+            await asyncio.to_thread(registry.write_snapshot)
+        except Exception:
+            logger.exception("Failed to write the metrics snapshot")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates shared resources and starts background workers before the first
+    request, and releases everything on shutdown. By then the server has
+    already stopped accepting connections and waited for in-flight requests,
+    including uploads, for its graceful shutdown timeout. `python -m src
+    serve` sets that timeout; plain uvicorn has none unless given
+    `--timeout-graceful-shutdown`, and then waits for requests indefinitely.
+    """
+    if settings.environment == 'development':
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+
+    if profiler.enabled:
+        # Lets profiles follow requests into asyncio.to_thread calls
+        asyncio.get_running_loop().set_default_executor(ProfilingExecutor())
+
+    await asyncio.to_thread(warm_db_pool)
+    get_http_client()
+    try:
+        get_signing_key()
+    except Exception:
+        logger.exception("Failed to parse the Mux signing key")
+    # Build the OpenAPI schema now rather than on the first /docs request
+    app.openapi()
+
+    await asyncio.gather(asyncio.to_thread(build_title_index),
+                         asyncio.to_thread(build_token_denylist))
+
+    # Starts the hashing processes and prepares the dummy hash for logins
+    await password_hasher.calibrate()
+    await password_hasher.verify_dummy("")
+
+    if settings.invalidation_bus_enabled:
+        invalidation_bus.start()
+
+    snapshots = None
+    if registry.snapshot_dir:
+        snapshots = asyncio.create_task(write_metrics_snapshots())
+
+    logger.info("Application started")
+    yield
+
+    await invalidation_bus.stop()
+    await close_http_client()
+    password_hasher.shutdown()
+    engine.dispose()
+    tracer.shutdown()
+
+    if snapshots is not None:
+        snapshots.cancel()
+        # Keep this worker's counts in the totals after it exits
+        registry.write_snapshot(final=True)
+    logger.info("Application stopped")
+
 
 # Create FastAPI app
 app = FastAPI(title="Youverse Task APIs",
               description="Video Streaming Platform API",
               version="1.0.0",
               docs_url="/docs",
-              redoc_url="/redoc")
-
-# Add the limiter to the app's state. This makes it accessible in request dependencies.
-app.state.limiter = limiter
-
-# Add a global exception handler for rate limit exceeded errors.
-app.add_exception_handler(RateLimitExceeded,
-                          _rate_limit_exceeded_handler)  # type: ignore
+              redoc_url="/redoc",
+              lifespan=lifespan)
 
 if (settings.environment == 'development'):
 
-    @app.on_event("startup")
-    async def create_tables():
-        Base.metadata.create_all(bind=engine)
-
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -49,7 +173,27 @@ async def app_error_handler(request: Request, exc: AppError):
     return JSONResponse(status_code=exc.status_code,
                         content={
                             "message": exc.detail,
-                        })
+                        },
+                        headers=exc.headers)
+
+
+# Report rate limit state on rate limited routes
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Record per-request SQL statistics, exposed as response headers in development
+app.add_middleware(QueryStatsMiddleware,
+                   expose_headers=settings.environment == 'development')
+
+
+# Record request counts and latencies per route template
+app.add_middleware(MetricsMiddleware)
+
+# Profile requests that ask for it with a signed X-Profile header
+app.add_middleware(ProfilerMiddleware)
+
+# Trace sampled requests. Added last, so it is the outermost middleware and
+# the span covers the whole request, profiling included
+app.add_middleware(TracingMiddleware)
 
 
 # App routes
@@ -61,6 +205,8 @@ app.include_router(subscription_router,
                    prefix="/api/v1/subscribe",
                    tags=["Subscriptions"])
 
+app.include_router(catalog_router, prefix="/api/v1/catalog", tags=["Catalog"])
+
 
 @app.get("/")
 async def root():
@@ -71,6 +217,47 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "youverse-apis"}
+
+
+@app.get("/health/caches")
+async def cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@app.get("/health/single-flight")
+async def single_flight_stats():
+    return {name: group.stats() for name, group in single_flights.items()}
+
+
+@app.get("/health/password-hashing")
+async def password_hashing_stats():
+    return password_hasher.stats()
+
+
+@app.get("/health/rate-limits")
+async def rate_limit_stats():
+    return limiter.stats()
+
+
+@app.get("/health/tracing")
+async def tracing_stats():
+    return tracer.stats()
+
+
+@app.get("/health/profiler")
+async def profiler_stats():
+    return profiler.stats()
+
+
+@app.get("/health/invalidation")
+async def invalidation_stats():
+    return invalidation_bus.stats()
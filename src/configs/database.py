@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .settings import settings
+from .metrics import gauge
 
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -13,4 +14,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _pool_connections():
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        yield ("checked_out", ), pool.checkedout()
+        yield ("idle", ), pool.checkedin()
+        yield ("overflow", ), max(pool.overflow(), 0)
+
+
+db_pool_connections = gauge("db_pool_connections",
+                            "Database connections in this process's pool",
+                            ["state"], _pool_connections)
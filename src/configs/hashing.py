@@ -0,0 +1,309 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+from passlib.hash import argon2
+
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
+
+from .logger import get_logger
+from .settings import settings
+
+T = TypeVar("T")
+
+logger = get_logger(__name__)
+
+# bcrypt never goes below passlib's default cost of 12, however slow the host
+_BCRYPT_MIN_ROUNDS, _BCRYPT_MAX_ROUNDS = 12, 16
+_ARGON2_MIN_ROUNDS, _ARGON2_MAX_ROUNDS = 2, 10
+
+# Hashing parameters are passed with every call, since pool workers are
+# separate processes; each worker builds one context per set of parameters
+_contexts: Dict[str, CryptContext] = {}
+
+
+def _context(options: Dict[str, Any]) -> CryptContext:
+    key = json.dumps(options, sort_keys=True)
+    context = _contexts.get(key)
+    if context is None:
+        context = _contexts[key] = CryptContext(**options)
+    return context
+
+
+def _hash(password: str, options: Dict[str, Any]) -> str:
+    return _context(options).hash(password)
+
+
+def _hash_batch(passwords: List[str], options: Dict[str, Any]) -> List[str]:
+    context = _context(options)
+    return [context.hash(password) for password in passwords]
+
+
+def _verify(password: str, hashed_password: str,
+            options: Dict[str, Any]) -> bool:
+    return _context(options).verify(password, hashed_password)
+
+
+def _verify_and_update(password: str, hashed_password: str,
+                       options: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    return _context(options).verify_and_update(password, hashed_password)
+
+
+def _time_hash(options: Dict[str, Any]) -> float:
+    """Returns the seconds one hash takes with the given parameters."""
+    context = _context(options)
+    context.hash("calibration")  # warm up
+    start = time.perf_counter()
+    context.hash("calibration")
+    return time.perf_counter() - start
+
+
+def _options(scheme: str, rounds: int) -> Dict[str, Any]:
+    """
+    CryptContext parameters hashing with `scheme` at `rounds`.
+
+    Pinning the minimum rounds makes hashes with a lower cost, or from the
+    other (deprecated) scheme, report that they need an update. Hashes with
+    a higher cost are kept, so workers that settled on different costs don't
+    keep rehashing each other's hashes.
+    """
+    schemes = [scheme]
+    if scheme == "argon2":
+        schemes.append("bcrypt")
+    elif argon2.has_backend():
+        schemes.append("argon2")
+
+    options: Dict[str, Any] = {
+        "schemes": schemes,
+        "deprecated": "auto",
+        f"{scheme}__default_rounds": rounds,
+        f"{scheme}__min_rounds": rounds,
+    }
+    if scheme == "argon2":
+        options["argon2__memory_cost"] = settings.password_hash_argon2_memory_kib
+        options["argon2__parallelism"] = settings.password_hash_argon2_parallelism
+    return options
+
+
+def _calibrate(scheme: str, target_ms: float) -> Dict[str, Any]:
+    """
+    Picks the highest cost whose hash still takes at most `target_ms` on
+    this machine, never going below the scheme's minimum.
+    """
+    if scheme == "bcrypt":
+        # Each bcrypt round doubles the work
+        rounds = _BCRYPT_MIN_ROUNDS
+        elapsed = _time_hash(_options(scheme, rounds))
+        while rounds < _BCRYPT_MAX_ROUNDS and elapsed * 2 * 1000 <= target_ms:
+            rounds += 1
+            elapsed *= 2
+        return _options(scheme, rounds)
+
+    # argon2's time cost adds passes over the configured memory
+    rounds = _ARGON2_MIN_ROUNDS
+    while rounds < _ARGON2_MAX_ROUNDS and _time_hash(
+            _options(scheme, rounds + 1)) * 1000 <= target_ms:
+        rounds += 1
+    return _options(scheme, rounds)
+
+
+def _configured_rounds(scheme: str) -> int:
+    floor = _BCRYPT_MIN_ROUNDS if scheme == "bcrypt" else _ARGON2_MIN_ROUNDS
+    rounds = settings.password_hash_rounds
+    if rounds and rounds < floor:
+        logger.warning("Password hash rounds raised to the minimum",
+                       extra={"rounds": rounds, "minimum": floor})
+    return max(rounds, floor)
+
+
+def _configured_scheme() -> str:
+    scheme = settings.password_hash_scheme
+    if scheme == "argon2" and not argon2.has_backend():
+        logger.warning(
+            "argon2 requested but argon2-cffi is not installed, using bcrypt")
+        return "bcrypt"
+    if scheme not in ("argon2", "bcrypt"):
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    return scheme
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a dedicated process pool.
+
+    bcrypt is deliberately slow CPU work; running it in the request handler
+    blocks the event loop and stalls every other request on the worker.
+    Calls are handed to a bounded pool of processes instead. When all
+    workers are busy and the queue is full, new calls are rejected with a
+    503 rather than piling up behind each other.
+
+    The hashing cost is calibrated at startup to the configured target
+    latency, unless pinned in settings. Logins rehash passwords stored with
+    other parameters through `verify_and_update`.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dummy_hash: Optional[str] = None
+        self.scheme = _configured_scheme()
+        self.options = _options(self.scheme, _configured_rounds(self.scheme))
+        # Whether the cost is settled: pinned in settings, or already
+        # calibrated, e.g. by the server before forking its workers
+        self.calibrated = bool(settings.password_hash_rounds)
+        self.calibrated_ms: Optional[float] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def share(self, server_workers: int) -> None:
+        """
+        Splits the pool and queue sizes across the server's worker processes.
+
+        The configured sizes are a budget for the whole machine. Without the
+        split, every pre-forked worker would start its own full pool and
+        accept its own full queue. Call this before the pool is started.
+
+        Args:
+            server_workers: The number of server processes sharing the machine
+        """
+        if server_workers > 1:
+            self.workers = max(1, self.workers // server_workers)
+            self.max_queue = max(1, self.max_queue // server_workers)
+
+    def calibrate_in_process(self) -> None:
+        """
+        Calibrates in the calling process. The pre-fork server calls this
+        once before forking, on an otherwise idle CPU, so every worker
+        inherits the same cost instead of benchmarking against the others.
+        """
+        if not self.calibrated:
+            self.options = _calibrate(self.scheme,
+                                      settings.password_hash_target_ms)
+            self.calibrated = True
+
+    async def calibrate(self) -> None:
+        """
+        Benchmarks hashing on the pool and adopts the highest cost that
+        meets `password_hash_target_ms`, unless the cost is already settled
+        (see `calibrate_in_process`) or pinned with `password_hash_rounds`.
+        Then measures how long a hash takes with the adopted cost.
+        """
+        if not self.calibrated:
+            self.options = await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), _calibrate, self.scheme,
+                settings.password_hash_target_ms)
+            self.calibrated = True
+        self.calibrated_ms = await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _time_hash, self.options) * 1000
+        self._dummy_hash = None
+        logger.info("Password hashing calibrated",
+                    extra={
+                        "scheme": self.scheme,
+                        "rounds": self.options[f"{self.scheme}__default_rounds"],
+                        "hash_ms": round(self.calibrated_ms, 1),
+                    })
+
+    async def hash(self, password: str) -> str:
+        """Hashes a password on the pool."""
+        return await self._submit(_hash, password, self.options)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Checks a password against its hash on the pool."""
+        return await self._submit(_verify, password, hashed_password,
+                                  self.options)
+
+    async def verify_and_update(
+            self, password: str,
+            hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Checks a password against its hash on the pool.
+
+        Returns whether it matched and, if the hash was made with other
+        parameters than the current ones, a replacement hash to store.
+        """
+        return await self._submit(_verify_and_update, password,
+                                  hashed_password, self.options)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hashes many passwords for offline jobs such as bulk imports, split
+        into one chunk per worker (times four, to even out stragglers).
+        Bypasses load shedding, so it must not be used to serve requests.
+        """
+        if not passwords:
+            return []
+        loop = asyncio.get_running_loop()
+        chunk_size = -(-len(passwords) // (self.workers * 4))
+        chunks = await asyncio.gather(*(loop.run_in_executor(
+            self._get_pool(), _hash_batch, passwords[start:start + chunk_size],
+            self.options) for start in range(0, len(passwords), chunk_size)))
+        self.completed += len(passwords)
+        return [hashed for chunk in chunks for hashed in chunk]
+
+    async def verify_dummy(self, password: str) -> bool:
+        """
+        Spends the same work as a real verification, against a hash no
+        password matches. Used for unknown users, so they cost and take as
+        long as known ones.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(32))
+        await self.verify(password, self._dummy_hash)
+        return False
+
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            logger.warning("Password hashing pool saturated",
+                           extra={"in_flight": self.in_flight})
+            raise AppError(ErrorCodes.SERVICE_UNAVAILABLE,
+                           "Too many sign-in requests, please retry shortly")
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked, so workers never inherit the server's
+            # threads, sockets or database connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scheme": self.scheme,
+            "rounds": self.options[f"{self.scheme}__default_rounds"],
+            "hash_ms": self.calibrated_ms,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers or max(1, (os.cpu_count() or 2) // 2),
+    max_queue=settings.password_hash_max_queue)
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import socket
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+from sqlalchemy import ColumnElement, func, select
+from sqlalchemy.orm import Session
+
+from .logger import get_logger
+from .settings import settings
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class InvalidationEvent:
+    """
+    A change to a cached entity, published by the worker that wrote it.
+
+    `version` increases with every committed write to the entity. Events
+    without one are deltas or idempotent adds and are always applied.
+    """
+    entity: str
+    id: str
+    op: str
+    version: Optional[int] = None
+    origin: str = ""
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+InvalidationHandler = Callable[[InvalidationEvent], None]
+
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Writers publish change events inside their own transaction, so an event
+    is only delivered if the write commits. Every worker runs a listener
+    task on a dedicated connection and dispatches events from other workers
+    to the handlers registered for the event's entity. A versioned event
+    that is not newer than the last one seen for the same entity is a
+    duplicate or arrived out of order, and is skipped so it can't roll a
+    cache back. After the listener reconnects, events may have been missed,
+    so the reset handlers run and drop whatever local state could be stale.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._handlers: Dict[str, List[InvalidationHandler]] = {}
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        # Latest version seen per (entity, id), for versioned events only
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self.received = 0
+        self.dispatched = 0
+        self.stale = 0
+
+    @staticmethod
+    def origin() -> str:
+        # Resolved per call, since workers may be forked after import
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def subscribe(self, entity: str, handler: InvalidationHandler) -> None:
+        """Registers a handler for events about an entity from other workers."""
+        self._handlers.setdefault(entity, []).append(handler)
+
+    def on_reset(self, handler: Callable[[], None]) -> None:
+        """Registers a handler run when events may have been missed."""
+        self._reset_handlers.append(handler)
+
+    def publish(self,
+                db: Session,
+                entity: str,
+                entity_id: str,
+                op: str,
+                version: Optional[int] = None,
+                **data: Any) -> None:
+        """
+        Queues a change event in the current transaction. Postgres delivers
+        it to every listener when the transaction commits.
+
+        Args:
+            version: The entity's version after this write. It must increase
+                with every write and be assigned under the entity's row lock,
+                so versions are ordered like the commits.
+        """
+        db.execute(
+            select(self.notification(entity, entity_id, op, version, **data)))
+
+    def notification(self,
+                     entity: str,
+                     entity_id: str,
+                     op: str,
+                     version: Optional[int] = None,
+                     **data: Any) -> ColumnElement:
+        """
+        Returns the `pg_notify(...)` call that `publish` runs, for writes
+        that queue their event in the same statement as the change itself.
+        """
+        payload = json.dumps(
+            {
+                "entity": entity,
+                "id": entity_id,
+                "op": op,
+                "version": version,
+                "origin": self.origin(),
+                "data": data,
+            },
+            default=str)
+        return func.pg_notify(self.channel, payload)
+
+    def dispatch(self, payload: str) -> None:
+        """Decodes a notification and runs the handlers for its entity."""
+        self.received += 1
+        try:
+            event = InvalidationEvent(**json.loads(payload))
+        except Exception:
+            logger.warning("Malformed invalidation event",
+                           extra={"payload": payload})
+            return
+
+        # The publishing worker already invalidated its own caches
+        if event.origin == self.origin():
+            return
+
+        if event.version is not None:
+            key = (event.entity, event.id)
+            seen = self._versions.get(key)
+            if seen is not None and event.version <= seen:
+                self.stale += 1
+                return
+            self._versions[key] = event.version
+
+        self.dispatched += 1
+        for handler in self._handlers.get(event.entity, []):
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Invalidation handler failed",
+                                 extra={
+                                     "entity": event.entity,
+                                     "id": event.id
+                                 })
+
+    def start(self) -> None:
+        """Starts the listener task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stops the listener task and closes its connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        connected_before = False
+        while True:
+            connection = None
+            fd = None
+            lost = asyncio.Event()
+            try:
+                connection = await asyncio.to_thread(self._connect)
+                # A dropped connection is marked closed and its fileno()
+                # raises, so keep the descriptor for removing the reader
+                fd = connection.fileno()
+                loop.add_reader(fd, self._drain, connection, lost)
+                if connected_before:
+                    self._reset()
+                connected_before = True
+                logger.info("Listening for cache invalidations",
+                            extra={"channel": self.channel})
+                await lost.wait()
+                logger.warning("Cache invalidation listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener failed")
+            finally:
+                if fd is not None:
+                    loop.remove_reader(fd)
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        logger.exception(
+                            "Failed to close the invalidation connection")
+
+            await asyncio.sleep(settings.invalidation_reconnect_seconds)
+
+    def _connect(self):
+        connection = psycopg2.connect(settings.database_url)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _drain(self, connection, lost: asyncio.Event) -> None:
+        try:
+            connection.poll()
+        except Exception:
+            lost.set()
+            return
+        while connection.notifies:
+            self.dispatch(connection.notifies.pop(0).payload)
+
+    def _reset(self) -> None:
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Invalidation reset handler failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "listening": self._task is not None and not self._task.done(),
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "stale": self.stale,
+        }
+
+
+invalidation_bus = InvalidationBus(settings.invalidation_channel)
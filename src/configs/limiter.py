@@ -1,5 +1,354 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Protocol, Tuple, TypeVar
 
-# Create a Limiter instance that uses the client's IP address as the identifier.
-limiter = Limiter(key_func=get_remote_address)
+from fastapi import Request
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
+from src.models.rate_limit import RateLimitState
+
+from .database import SessionLocal
+from .logger import get_logger
+from .metrics import counter
+from .settings import settings
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+logger = get_logger(__name__)
+
+rate_limit_rejections = counter("rate_limit_rejections",
+                                "Requests rejected by the rate limiter",
+                                ["route"])
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`count` requests per `period` seconds, parsed from e.g. "50/minute"."""
+    count: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        count, period = value.split("/")
+        return cls(int(count), _PERIODS[period.strip().rstrip("s")])
+
+    @property
+    def interval(self) -> float:
+        """Time it takes to restore the capacity for one request."""
+        return self.period / self.count
+
+
+@dataclass
+class RateLimitResult:
+    """The outcome of a rate limited request, as reported in headers."""
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float = 0.0
+
+    @property
+    def allowed(self) -> bool:
+        return self.retry_after <= 0
+
+
+class RateLimitBackend(Protocol):
+    # Whether `consume` does I/O and must run off the event loop
+    blocking: bool
+
+    def consume(self, key: str, limit: RateLimit, cost: int,
+                now: float) -> Tuple[bool, float]:
+        """
+        Atomically spends `cost` requests from `key`'s bucket using GCRA.
+
+        Returns whether they were granted and the key's theoretical arrival
+        time (TAT) afterwards; a denied call leaves the TAT unchanged.
+        """
+        ...
+
+
+class MemoryBackend:
+    """GCRA state kept in this process. Only exact with a single worker."""
+
+    blocking = False
+
+    def __init__(self, prune_every: int = 10_000):
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._prune_every = prune_every
+        self._calls = 0
+
+    def consume(self, key: str, limit: RateLimit, cost: int,
+                now: float) -> Tuple[bool, float]:
+        with self._lock:
+            self._calls += 1
+            if self._calls % self._prune_every == 0:
+                self._tats = {k: t for k, t in self._tats.items() if t > now}
+
+            tat = max(self._tats.get(key, now), now) + cost * limit.interval
+            if tat - now > limit.period:
+                return False, self._tats.get(key, now)
+            self._tats[key] = tat
+            return True, tat
+
+
+class PostgresBackend:
+    """
+    GCRA state shared by every worker through the `rate_limits` table.
+
+    Each call is a single `INSERT ... ON CONFLICT DO UPDATE ... WHERE`: the
+    row is only advanced if the requests fit in the bucket, so concurrent
+    workers can never spend the same capacity twice.
+    """
+
+    blocking = True
+
+    def __init__(self, prune_every: int = 1000):
+        self._prune_every = prune_every
+        self._calls = 0
+
+    def consume(self, key: str, limit: RateLimit, cost: int,
+                now: float) -> Tuple[bool, float]:
+        increment = cost * limit.interval
+        advanced_tat = func.greatest(RateLimitState.tat, now) + increment
+        stmt = insert(RateLimitState).values(
+            key=key, tat=now + increment).on_conflict_do_update(
+                index_elements=[RateLimitState.key],
+                set_={"tat": advanced_tat},
+                where=advanced_tat - now <= limit.period).returning(
+                    RateLimitState.tat)
+
+        db = SessionLocal()
+        try:
+            tat = db.execute(stmt).scalar()
+            granted = tat is not None
+            if not granted:
+                tat = db.query(RateLimitState.tat).filter(
+                    RateLimitState.key == key).scalar()
+
+            # Rows whose TAT has passed carry no state; drop them now and then
+            self._calls += 1
+            if self._calls % self._prune_every == 0:
+                db.query(RateLimitState).filter(
+                    RateLimitState.tat < now).delete(synchronize_session=False)
+
+            db.commit()
+        finally:
+            db.close()
+
+        return granted, tat if tat is not None else now
+
+
+@dataclass
+class _Reservation:
+    """Requests pre-spent from the shared bucket and handed out locally."""
+    tokens: int
+    tat: float
+    expires_at: float
+
+
+@dataclass
+class RequestRateLimit:
+    """Per-request holder the rate limit headers are read from."""
+    result: Optional[RateLimitResult] = None
+
+
+_current_limit: ContextVar[Optional[RequestRateLimit]] = ContextVar(
+    "rate_limit", default=None)
+
+
+@contextmanager
+def track_rate_limit() -> Iterator[RequestRateLimit]:
+    """Collects the rate limit result of the request handled inside the block."""
+    holder = RequestRateLimit()
+    token = _current_limit.set(holder)
+    try:
+        yield holder
+    finally:
+        _current_limit.reset(token)
+
+
+def identify(request: Request) -> str:
+    """
+    Identifies the caller: the JWT subject when the request carries a valid
+    access token, the client IP otherwise.
+
+    The token is verified the same way the `Auth` dependency does it, through
+    the shared cache of verified tokens, so a signed-in caller always gets
+    the same bucket, whether or not the route requires authentication.
+    """
+    # Imported here since the auth middleware depends on modules using the limiter
+    from src.middlewares.auth import verify_token
+
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token.strip():
+        try:
+            return f"user:{verify_token(token.strip()).sub}"
+        except AppError:
+            pass
+
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class Limiter:
+    """
+    Token bucket (GCRA) rate limiter with a pluggable storage backend.
+
+    With a shared backend, a worker spends up to `batch_size` requests from
+    the shared bucket at once and hands them out locally, so most requests
+    never touch the backend. Reservations expire after the time their
+    requests take to refill, which bounds how long a worker can hoard them.
+    """
+
+    def __init__(self, backend: RateLimitBackend, batch_size: int = 1):
+        self.backend = backend
+        self.batch_size = batch_size
+        self._reservations: Dict[str, _Reservation] = {}
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.backend_calls = 0
+        self.backend_errors = 0
+
+    def limit(self, value: str) -> Callable[[F], F]:
+        """
+        Limits a route to `value` requests (e.g. "50/minute") per caller.
+        The route must accept a `request: Request` argument.
+        """
+        rate = RateLimit.parse(value)
+
+        def decorator(fn: F) -> F:
+            scope = f"{fn.__module__}.{fn.__qualname__}"
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                request = kwargs.get("request")
+                if request is None:
+                    request = next(arg for arg in args
+                                   if isinstance(arg, Request))
+                await self.hit(scope, identify(request), rate)
+                return await fn(*args, **kwargs)
+
+            return wrapper  # type: ignore
+
+        return decorator
+
+    async def hit(self, scope: str, identity: str,
+                  rate: RateLimit) -> RateLimitResult:
+        """
+        Spends one request from the identity's bucket for a route.
+
+        Raises:
+            AppError: 429 with a `Retry-After` header if the bucket is empty.
+        """
+        key = f"{scope}:{identity}"
+        result = self._take_reserved(key, rate)
+        if result is None:
+            result = await self._reserve(key, rate)
+
+        holder = _current_limit.get()
+        if holder is not None:
+            holder.result = result
+
+        if not result.allowed:
+            self.rejected += 1
+            rate_limit_rejections.labels(scope).inc()
+            raise AppError(
+                ErrorCodes.TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(result.retry_after))})
+
+        self.allowed += 1
+        return result
+
+    def _take_reserved(self, key: str,
+                       rate: RateLimit) -> Optional[RateLimitResult]:
+        now = time.time()
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None or reservation.tokens <= 0 or reservation.expires_at <= now:
+                return None
+            reservation.tokens -= 1
+            return self._result(rate, reservation.tat, reservation.tokens, now)
+
+    async def _reserve(self, key: str, rate: RateLimit) -> RateLimitResult:
+        batch = max(1, min(self.batch_size, rate.count // 10))
+        now = time.time()
+        try:
+            granted, tat = await self._consume(key, rate, batch, now)
+            if not granted and batch > 1:
+                batch = 1
+                granted, tat = await self._consume(key, rate, batch, now)
+        except Exception:
+            # Fail open: an unavailable backend must not take the API down
+            self.backend_errors += 1
+            logger.exception("Rate limit backend failed")
+            return RateLimitResult(rate.count, rate.count, 0.0)
+
+        if not granted:
+            return RateLimitResult(rate.count, 0, max(0.0, tat - now),
+                                   retry_after=max(
+                                       tat - now - rate.period + rate.interval,
+                                       0.001))
+
+        with self._lock:
+            if len(self._reservations) >= 10_000:
+                self._reservations = {
+                    k: r for k, r in self._reservations.items()
+                    if r.expires_at > now
+                }
+            self._reservations[key] = _Reservation(
+                tokens=batch - 1,
+                tat=tat,
+                expires_at=now + batch * rate.interval)
+
+        return self._result(rate, tat, batch - 1, now)
+
+    async def _consume(self, key: str, rate: RateLimit, cost: int,
+                       now: float) -> Tuple[bool, float]:
+        self.backend_calls += 1
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.backend.consume, key, rate,
+                                           cost, now)
+        return self.backend.consume(key, rate, cost, now)
+
+    @staticmethod
+    def _result(rate: RateLimit, tat: float, reserved: int,
+                now: float) -> RateLimitResult:
+        # Locally reserved requests are still available to this caller
+        remaining = int((rate.period - (tat - now)) // rate.interval) + reserved
+        return RateLimitResult(limit=rate.count,
+                               remaining=max(0, min(rate.count, remaining)),
+                               reset=max(0.0, tat - now - reserved * rate.interval))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "backend_calls": self.backend_calls,
+            "backend_errors": self.backend_errors,
+            "reservations": len(self._reservations),
+        }
+
+
+def _create_backend() -> RateLimitBackend:
+    if settings.rate_limit_backend == "postgres":
+        return PostgresBackend()
+    if settings.rate_limit_backend == "memory":
+        return MemoryBackend()
+    raise ValueError(
+        f"Unknown rate limit backend: {settings.rate_limit_backend}")
+
+
+limiter = Limiter(_create_backend(), batch_size=settings.rate_limit_batch_size)
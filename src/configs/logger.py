@@ -0,0 +1,45 @@
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from .settings import settings
+
+# Attributes every LogRecord carries; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {
+        "message", "asctime", "taskName"
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp":
+            datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRIBUTES
+        })
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+_root_logger = logging.getLogger("youverse")
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(JsonFormatter())
+_root_logger.addHandler(_handler)
+_root_logger.setLevel(settings.log_level.upper())
+_root_logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a structured logger namespaced under the application logger."""
+    return _root_logger.getChild(name)
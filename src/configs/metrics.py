@@ -0,0 +1,324 @@
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Counts of exited workers, folded together by the supervisor
+RETIRED_SNAPSHOT = "retired.json"
+
+LabelValues = Tuple[str, ...]
+
+# Request latencies, from 5 ms to 10 s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+class Metric:
+    """
+    Base class for a metric family with a fixed set of label names.
+
+    Each combination of label values gets its own child, created once under
+    a lock; recording on a child afterwards takes no lock and relies on the
+    GIL, which keeps instrumentation to a few attribute updates.
+    """
+    type = ""
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        key = values or tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Dict[str, str], float]]:
+        """Yields (suffix, label values, extra labels, value) for every sample."""
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", )
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield "_total", values, {}, child.value
+
+
+class Gauge(Metric):
+    """A gauge whose values are read from a callback when rendered."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[LabelValues, float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            for values, value in self.callback():
+                yield "", values, {}, value
+        except Exception:
+            logger.exception("Failed to collect gauge",
+                             extra={"metric": self.name})
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"), ),
+                                    child.counts):
+                cumulative += count
+                yield "_bucket", values, {"le": _format_bound(bound)}, cumulative
+            yield "_count", values, {}, cumulative
+            yield "_sum", values, {}, child.sum
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """
+    Holds every metric and renders them in the Prometheus text format.
+
+    With a snapshot directory, each process also writes its samples there,
+    and rendering adds up the snapshots of every process, so any worker of a
+    pre-forked server can answer a scrape for the whole server. When a
+    worker exits, the supervisor folds its final counts into a single
+    `retired.json` and deletes its snapshots, so recycled workers don't
+    pile up files. Readers hold a shared lock on the directory and folding
+    holds an exclusive one, so a scrape never counts a worker twice or not
+    at all.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.snapshot_dir: Optional[str] = None
+        self._snapshot_name: Optional[Tuple[int, str]] = None
+        self._snapshot_lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collect(self,
+                include_gauges: bool = True) -> Dict[str, Dict[str, float]]:
+        """Returns {metric name: {sample line prefix: value}} for this process."""
+        collected: Dict[str, Dict[str, float]] = {}
+        for metric in self.metrics.values():
+            if not include_gauges and isinstance(metric, Gauge):
+                continue
+            samples = collected.setdefault(metric.name, {})
+            for suffix, values, extra, value in metric.samples():
+                labels = dict(zip(metric.labelnames, values), **extra)
+                label_text = ",".join(f'{name}="{_escape(str(label))}"'
+                                      for name, label in labels.items())
+                key = f"{metric.name}{suffix}{{{label_text}}}" if label_text else f"{metric.name}{suffix}"
+                samples[key] = samples.get(key, 0.0) + value
+        return collected
+
+    def _snapshot_path(self) -> str:
+        # Named by PID and start time, so a process that reuses a dead
+        # worker's PID never overwrites that worker's final counts
+        pid = os.getpid()
+        if self._snapshot_name is None or self._snapshot_name[0] != pid:
+            self._snapshot_name = (pid, f"{pid}-{time.time_ns()}.json")
+        return os.path.join(self.snapshot_dir, self._snapshot_name[1])
+
+    def write_snapshot(self, final: bool = False) -> None:
+        """
+        Writes this process's samples to the snapshot directory. The final
+        snapshot of an exiting process keeps its counts but drops its
+        gauges, which no longer describe anything alive.
+        """
+        if not self.snapshot_dir:
+            return
+        # Collecting and writing under one lock keeps an older collection
+        # from replacing a newer one, so counters never go backwards
+        with self._snapshot_lock:
+            path = self._snapshot_path()
+            with open(f"{path}.tmp", "w") as file:
+                json.dump(self.collect(include_gauges=not final), file)
+            os.replace(f"{path}.tmp", path)
+
+    def render(self) -> str:
+        if self.snapshot_dir:
+            # Sum snapshot files only, this process's included once it is
+            # current: a live count added to other workers' older snapshots
+            # could come out lower on the next scrape served by another worker
+            self.write_snapshot()
+            collected = self._merge_snapshots()
+        else:
+            collected = self.collect()
+
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key, value in collected.get(metric.name, {}).items():
+                lines.append(f"{key} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def retire_snapshots(self, pid: int) -> None:
+        """
+        Folds the snapshots of an exited process into `retired.json` and
+        deletes them. Gauges are dropped, since they describe live state.
+
+        Args:
+            pid: The process ID of the exited worker
+        """
+        if not self.snapshot_dir:
+            return
+        prefix = f"{pid}-"
+        with self._directory_lock(exclusive=True):
+            file_names = [
+                file_name for file_name in os.listdir(self.snapshot_dir)
+                if file_name.startswith(prefix)
+            ]
+            snapshots = [name for name in file_names if name.endswith(".json")]
+            if snapshots:
+                gauges = {
+                    name for name, metric in self.metrics.items()
+                    if isinstance(metric, Gauge)
+                }
+                retired = {
+                    name: samples
+                    for name, samples in self._read_snapshots(
+                        [RETIRED_SNAPSHOT] + snapshots).items()
+                    if name not in gauges
+                }
+                path = os.path.join(self.snapshot_dir, RETIRED_SNAPSHOT)
+                with open(f"{path}.tmp", "w") as file:
+                    json.dump(retired, file)
+                os.replace(f"{path}.tmp", path)
+            # Leftover temporary files of the exited process go as well
+            for file_name in file_names:
+                os.remove(os.path.join(self.snapshot_dir, file_name))
+
+    @contextmanager
+    def _directory_lock(self, exclusive: bool) -> Iterator[None]:
+        with open(os.path.join(self.snapshot_dir, ".lock"), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield  # Released when the file is closed
+
+    def _merge_snapshots(self) -> Dict[str, Dict[str, float]]:
+        with self._directory_lock(exclusive=False):
+            return self._read_snapshots([
+                file_name for file_name in os.listdir(self.snapshot_dir)
+                if file_name.endswith(".json")
+            ])
+
+    def _read_snapshots(
+            self, file_names: List[str]) -> Dict[str, Dict[str, float]]:
+        merged: Dict[str, Dict[str, float]] = {}
+        for file_name in file_names:
+            try:
+                with open(os.path.join(self.snapshot_dir, file_name)) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in samples.items():
+                    target[key] = target.get(key, 0.0) + value
+        return merged
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str,
+            labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str,
+              documentation: str,
+              labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(
+        Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str],
+          callback: Callable[[], Iterable[Tuple[LabelValues, float]]]) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, callback))
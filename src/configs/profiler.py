@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .logger import get_logger
+from .settings import settings
+
+logger = get_logger(__name__)
+
+
+def sign_profile_token(expires_at: int, secret: str) -> str:
+    """Returns an `X-Profile` header value valid until `expires_at` (Unix time)."""
+    signature = hmac.new(secret.encode(), str(expires_at).encode(),
+                         hashlib.sha256).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_token(token: str, secret: str) -> bool:
+    """Checks an `X-Profile` header value's signature and expiry."""
+    expires_at, _, signature = token.partition(".")
+    if not secret or not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(
+        sign_profile_token(int(expires_at), secret).encode(),
+        token.encode())
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _awaited_frames(task: "asyncio.Task[Any]") -> List[FrameType]:
+    """Returns the frames of a suspended task's await chain, outermost first."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame",
+                                                    None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None) or getattr(
+                awaitable, "ag_await", None)
+    return frames
+
+
+class RequestProfile:
+    """
+    Samples one request's stacks from a background thread.
+
+    On every tick, if the event loop is running the request's task, the loop
+    thread's stack is recorded from the task's outermost coroutine down to
+    the running function. Otherwise the task is suspended, and its chain of
+    awaited coroutines is recorded. If the request handed work to executor
+    threads (`asyncio.to_thread`, see `ProfilingExecutor`), each busy
+    thread's stack is recorded under that chain and a `[thread]` frame;
+    otherwise the chain ends in an `[awaiting]` leaf, so time spent waiting
+    on the database, Mux or child tasks shows up too.
+    """
+
+    def __init__(self, task: "asyncio.Task[Any]", path: str,
+                 interval: float):
+        self.task = task
+        self.path = path
+        self.interval = interval
+        self.loop = task.get_loop()
+        self.loop_thread = threading.get_ident()
+        self.samples: Counter = Counter()
+        # Executor threads currently running work for this request
+        self.threads: Set[int] = set()
+        self.token = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name="request-profiler",
+                                        daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling; the folded stacks are written by the sampling thread."""
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                logger.exception("Failed to sample request stack")
+        self._write()
+
+    def _sample(self) -> None:
+        root = self.task.get_coro().cr_frame
+        if root is None:
+            return
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.loop_thread)
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                if frame is root:
+                    break
+                frame = frame.f_back
+            if stack and stack[-1] is root:
+                self.samples[";".join(_label(f) for f in reversed(stack))] += 1
+                return
+        awaited = ";".join(_label(f) for f in _awaited_frames(self.task))
+        if not awaited:
+            return
+        threads = list(self.threads)
+        if not threads:
+            self.samples[awaited + ";[awaiting]"] += 1
+            return
+        frames = sys._current_frames()
+        for ident in threads:
+            stack = []
+            frame = frames.get(ident)
+            # Stop at the executor wrapper, leaving out the pool's internals
+            while frame is not None and frame.f_code is not _run_for.__code__:
+                stack.append(frame)
+                frame = frame.f_back
+            self.samples[";".join([awaited, "[thread]"] +
+                                  [_label(f) for f in reversed(stack)])] += 1
+
+    def _write(self) -> None:
+        if not self.samples:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as file:
+                for stack, count in self.samples.most_common():
+                    file.write(f"{stack} {count}\n")
+            logger.info("Wrote request profile",
+                        extra={
+                            "path": self.path,
+                            "samples": sum(self.samples.values())
+                        })
+        except Exception:
+            logger.exception("Failed to write request profile",
+                             extra={"path": self.path})
+
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "active_profile", default=None)
+
+
+def _run_for(profile: RequestProfile, fn: Callable[..., Any], args: tuple,
+             kwargs: Dict[str, Any]) -> Any:
+    ident = threading.get_ident()
+    profile.threads.add(ident)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.threads.discard(ident)
+
+
+class ProfilingExecutor(ThreadPoolExecutor):
+    """
+    The event loop's default executor while profiling is enabled.
+
+    Work submitted from a profiled request, e.g. through `asyncio.to_thread`
+    (including loads it starts as single-flight tasks), is tagged with the
+    request's profile, so the sampler also records the thread running it.
+    Other work runs exactly as in a plain `ThreadPoolExecutor`.
+    """
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any,
+               **kwargs: Any) -> Future:
+        profile = _active_profile.get()
+        if profile is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(_run_for, profile, fn, args, kwargs)
+
+
+class Profiler:
+    """
+    Decides which requests to profile and starts their samplers.
+
+    A request is profiled if it carries a valid signed `X-Profile` header, or
+    at random with probability `sample_rate`. At most `max_concurrent`
+    requests per process are profiled at once.
+    """
+
+    def __init__(self, secret: str, sample_rate: float, interval_ms: float,
+                 output_dir: str, max_concurrent: int):
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.profiled = 0
+        self.rejected_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret) or self.sample_rate > 0
+
+    def accepts(self, token: Optional[str]) -> bool:
+        """Returns whether a request with this `X-Profile` value is profiled."""
+        if token is not None:
+            if verify_profile_token(token, self.secret):
+                return True
+            self.rejected_tokens += 1
+        return False
+
+    def start(self, name: str) -> Optional[RequestProfile]:
+        """Starts profiling the current task, unless too many already are."""
+        if self.active >= self.max_concurrent:
+            return None
+        self.active += 1
+        self.profiled += 1
+        file_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+        path = os.path.join(
+            self.output_dir,
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self.profiled}-{file_name}.folded")
+        profile = RequestProfile(asyncio.current_task(), path, self.interval)
+        profile.token = _active_profile.set(profile)
+        profile.start()
+        return profile
+
+    def finish(self, profile: RequestProfile) -> None:
+        self.active -= 1
+        _active_profile.reset(profile.token)
+        profile.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "active": self.active,
+            "profiled": self.profiled,
+            "rejected_tokens": self.rejected_tokens,
+        }
+
+
+profiler = Profiler(settings.profiler_secret,
+                    sample_rate=settings.profiler_sample_rate,
+                    interval_ms=settings.profiler_interval_ms,
+                    output_dir=settings.profiler_output_dir,
+                    max_concurrent=settings.profiler_max_concurrent)
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     access_token_secret_key: str
     access_token_expire_minutes: int
     access_token_algorithm: str
+    refresh_token_expire_days: int = 30
+    verified_token_cache_size: int = 10_000
 
     # MUX Configuration
     mux_token_id: str
@@ -18,10 +20,79 @@ class Settings(BaseSettings):
 
     max_video_size: int = 500 * 1024 * 1024
 
+    # Password Hashing Configuration (0 workers = half the CPU cores,
+    # 0 rounds = calibrate the cost to the target latency at startup)
+    password_hash_workers: int = 0
+    password_hash_max_queue: int = 64
+    password_hash_scheme: str = "bcrypt"
+    password_hash_target_ms: float = 250.0
+    password_hash_rounds: int = 0
+    password_hash_argon2_memory_kib: int = 65536
+    password_hash_argon2_parallelism: int = 2
+
+    # Rate Limiting Configuration ("postgres" is shared by all workers)
+    rate_limit_backend: str = "postgres"
+    rate_limit_batch_size: int = 10
+
+    # Login Throttling Configuration (counters follow rate_limit_backend;
+    # the cache size only applies to the memory backend)
+    login_account_max_failures: int = 5
+    login_ip_max_failures: int = 20
+    login_lockout_base_seconds: float = 2.0
+    login_lockout_max_seconds: float = 900.0
+    login_failure_window_seconds: float = 3600.0
+    login_throttle_cache_size: int = 100_000
+
+    # Bulk User Import Configuration
+    user_import_batch_size: int = 1000
+
+    # Bulk Enrollment Configuration
+    bulk_enrollment_max_pairs: int = 100_000
+    bulk_enrollment_batch_size: int = 1000
+
+    # Course Catalog Cache Configuration
+    course_catalog_cache_size: int = 1024
+    course_catalog_cache_ttl_seconds: float = 30.0
+
+    # Cross-Worker Cache Invalidation Configuration
+    invalidation_bus_enabled: bool = True
+    invalidation_channel: str = "cache_invalidation"
+    invalidation_reconnect_seconds: float = 5.0
+
+    # Query Instrumentation Configuration
+    slow_query_threshold_ms: float = 200.0
+    n_plus_one_threshold: int = 10
+
     # Server Configuration
     host: str = "127.0.0.1"
     port: int = 8000
     debug: bool = True
+    log_level: str = "INFO"
+    shutdown_drain_seconds: float = 30.0
+
+    # Production Server Configuration (python -m src serve; 0 = off/default)
+    server_workers: int = 0
+    server_backlog: int = 2048
+    server_keep_alive_seconds: int = 5
+    server_limit_concurrency: int = 0
+    server_max_requests: int = 0
+    server_max_requests_jitter: int = 0
+
+    # Metrics Configuration (metrics_dir shares samples between workers)
+    metrics_dir: str = ""
+    metrics_snapshot_interval_seconds: float = 5.0
+
+    # Tracing Configuration (spans are appended to tracing_export_path)
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 0.01
+    tracing_export_path: str = "traces.jsonl"
+
+    # Profiler Configuration (requests opt in with a signed X-Profile header)
+    profiler_secret: str = ""
+    profiler_sample_rate: float = 0.0
+    profiler_interval_ms: float = 5.0
+    profiler_output_dir: str = "profiles"
+    profiler_max_concurrent: int = 2
 
     # Environment Configuration
     environment: str = 'development'
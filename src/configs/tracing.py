@@ -0,0 +1,340 @@
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .logger import get_logger
+from .settings import settings
+
+logger = get_logger(__name__)
+
+# version-trace_id-parent_id-flags, see https://www.w3.org/TR/trace-context/
+_TRACEPARENT = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+class Span:
+    """
+    A timed operation within a trace.
+
+    An unsampled request still gets a server span, which records nothing
+    and has no children, so the trace and its sampling decision are passed
+    on to the services it calls.
+    """
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "kind",
+                 "start_ns", "end_ns", "attributes", "error", "sampled")
+
+    def __init__(self,
+                 tracer: "Tracer",
+                 trace_id: str,
+                 parent_id: Optional[str],
+                 name: str,
+                 kind: str,
+                 attributes: Optional[Dict[str, Any]],
+                 sampled: bool = True,
+                 span_id: Optional[str] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = span_id or _new_id(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the span in the OTLP/JSON field layout."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {
+                "code": "ERROR",
+                "message": self.error
+            } if self.error else {
+                "code": "OK"
+            },
+            "resource": {
+                "service.name": "youverse-apis",
+                "process.pid": os.getpid()
+            },
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span",
+                                                       default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parses a W3C `traceparent` header.
+
+    Returns:
+        (trace ID, parent span ID, sampled flag), or None if the header is
+        missing or malformed.
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class JsonLinesExporter:
+    """
+    Appends finished spans to a file, one JSON object per line.
+
+    Spans are queued and written by a background thread, so request code
+    never waits on the disk. When the queue is full, spans are dropped
+    rather than slowing requests down.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10_000):
+        self.path = path
+        self.exported = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        # Forked workers don't inherit the parent's thread; start their own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._thread = threading.Thread(target=self._run,
+                                        name="span-exporter",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            span = self._queue.get()
+            batch: List[Span] = []
+            while span is not None:
+                batch.append(span)
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if span is None:
+                return
+
+    def _write(self, batch: List[Span]) -> None:
+        try:
+            lines = "".join(
+                json.dumps(span.to_dict(), default=str) + "\n"
+                for span in batch)
+            # One append per batch keeps lines from different workers whole
+            with open(self.path, "a") as file:
+                file.write(lines)
+            self.exported += len(batch)
+        except Exception:
+            self.dropped += len(batch)
+            logger.exception("Failed to export spans",
+                             extra={"path": self.path})
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Writes the queued spans and stops the background thread."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class Tracer:
+    """
+    Creates spans and decides which traces are sampled.
+
+    A request that arrives with a `traceparent` header keeps its caller's
+    trace ID and sampling decision; otherwise a new trace is sampled with
+    probability `sample_rate`, derived from the trace ID so every service
+    that sees the trace makes the same call.
+    """
+
+    def __init__(self, exporter: JsonLinesExporter, enabled: bool,
+                 sample_rate: float):
+        self.exporter = exporter
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None,
+                    attributes: Optional[Dict[str, Any]] = None
+                    ) -> Optional[Span]:
+        """
+        Starts a server span for an incoming request.
+
+        Returns:
+            The span, or None if tracing is off. An unsampled trace gets a
+            non-recording span that only carries the trace context.
+        """
+        if not self.enabled:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = int(trace_id[16:], 16) < self.sample_rate * 2**64
+        if not sampled:
+            # Not recording: pass the caller's parent ID on unchanged
+            return Span(self, trace_id, None, name, "SERVER", None,
+                        sampled=False, span_id=parent_id)
+        return Span(self, trace_id, parent_id, name, "SERVER", attributes)
+
+    def start_span(self, name: str, kind: str = "INTERNAL",
+                   attributes: Optional[Dict[str, Any]] = None
+                   ) -> Optional[Span]:
+        """Starts a child of the current span, or returns None outside a sampled trace."""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return None
+        return Span(self, parent.trace_id, parent.span_id, name, kind,
+                    attributes)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "INTERNAL",
+             **attributes: Any) -> Iterator[Optional[Span]]:
+        """Runs the block in a child span of the current span."""
+        span = self.start_span(name, kind, attributes)
+        if span is None:
+            yield None
+            return
+        with activate(span):
+            yield span
+
+    def export(self, span: Span) -> None:
+        self.exporter.export(span)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped,
+        }
+
+
+@contextmanager
+def activate(span: Span) -> Iterator[Span]:
+    """
+    Makes `span` the current span for the block and ends it afterwards,
+    recording any exception that escapes.
+    """
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport to record a client span for every request
+    made within a sampled trace, and to pass the trace and its sampling
+    decision on in `traceparent`.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport,
+                 name: Callable[[httpx.Request], str]):
+        self.transport = transport
+        self.name = name
+
+    async def handle_async_request(
+            self, request: httpx.Request) -> httpx.Response:
+        span = tracer.start_span(
+            self.name(request), "CLIENT", {
+                "http.method": request.method,
+                "server.address": request.url.host,
+                "url.path": request.url.path,
+            })
+        if span is None:
+            current = _current_span.get()
+            if current is not None:
+                request.headers["traceparent"] = current.traceparent
+            return await self.transport.handle_async_request(request)
+
+        request.headers["traceparent"] = span.traceparent
+        with activate(span):
+            response = await self.transport.handle_async_request(request)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.error = f"HTTP {response.status_code}"
+            return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+tracer = Tracer(JsonLinesExporter(settings.tracing_export_path),
+                enabled=settings.tracing_enabled,
+                sample_rate=settings.tracing_sample_rate)
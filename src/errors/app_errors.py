@@ -2,7 +2,7 @@ from fastapi import HTTPException
 from .error_codes import ErrorCodes
 
 class AppError(HTTPException):
-    def __init__(self, error_code: ErrorCodes, custom_message: str | None = None, custom_status: int | None = None):
+    def __init__(self, error_code: ErrorCodes, custom_message: str | None = None, custom_status: int | None = None, headers: dict[str, str] | None = None):
         """
         Create an AppError from an ErrorCode enum value
         
@@ -10,12 +10,14 @@ class AppError(HTTPException):
             error_code: The ErrorCodes enum value
             custom_message: Optional custom message to override the default
             custom_status: Optional custom status to override the default
+            headers: Optional headers to send with the error response
         """
         code_obj = error_code.value  # Get the ErrorCode object from the enum
         
         super().__init__(
             status_code=custom_status or code_obj.status,
-            detail=custom_message or code_obj.message
+            detail=custom_message or code_obj.message,
+            headers=headers
         )
         
         self.error_code = error_code
@@ -14,8 +14,10 @@ class ErrorCodes(Enum):
     PERMISSION_NOT_GRANTED = ErrorCode(403, "Permission not granted!")
     NOT_FOUND = ErrorCode(404, "Not found!")
     UPLOAD_TIMEOUT = ErrorCode(408, "Upload processing timeout")
+    TOO_MANY_REQUESTS = ErrorCode(429, "Too many requests")
     INTERNAL_SERVER_ERROR = ErrorCode(500, "Internal Server Error")
     EXTERNAL_SERVICE_ERROR = ErrorCode(503, "External service error")
+    SERVICE_UNAVAILABLE = ErrorCode(503, "Service temporarily unavailable")
 
 # Create a convenience instance for easy access
 error_codes = ErrorCodes
\ No newline at end of file
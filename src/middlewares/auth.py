@@ -1,27 +1,103 @@
+import hashlib
+import time
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt, ExpiredSignatureError
 
+from src.configs.cache import TTLCache
 from src.configs.settings import settings
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
 from src.models.user import UserRole
 from src.modules.auth.schemas import TokenData
+from src.modules.auth.utils import token_denylist
+from typing import Optional
 
 security = HTTPBearer()
 
+# Parsed claims of tokens that already passed verification, keyed by the
+# token's SHA-256 digest and kept until the token expires
+verified_tokens = TTLCache("verified_tokens",
+                           max_size=settings.verified_token_cache_size,
+                           ttl=settings.access_token_expire_minutes * 60)
+
+def verify_token(token: str) -> TokenData:
+    """
+    Validate a JWT access token and extract user data
+
+    Tokens that already passed verification are served from
+    `verified_tokens`, skipping the signature check and model validation;
+    revocation is checked every time. Used by `Auth` and by the rate
+    limiter, so both identify a caller the same way.
+
+    Args:
+        token: The encoded JWT access token
+
+    Returns:
+        TokenData: Authenticated user data
+
+    Raises:
+        AppError: If token is invalid, expired, revoked or missing
+    """
+    if not token:
+        raise AppError(ErrorCodes.BAD_REQUEST, "No token provided!")
+
+    # Skip signature verification and model validation for known tokens
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = verified_tokens.get(digest)
+    if cached is not None:
+        _check_not_revoked(cached)
+        return cached
+
+    try:
+        # Verify the JWT token
+        payload = jwt.decode(
+            token, 
+            settings.access_token_secret_key, 
+            algorithms=[settings.access_token_algorithm]
+        )
+        
+        token_data = TokenData(**payload)
+    
+    except ExpiredSignatureError:
+        raise AppError(ErrorCodes.UNAUTHORIZED, "Token is expired!")
+    except JWTError:
+        raise AppError(ErrorCodes.UNAUTHORIZED, "Invalid token!")
+    except Exception:
+        raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR, "JWT token error")
+
+    if token_data.exp is None:
+        verified_tokens.set(digest, token_data)
+    else:
+        verified_tokens.set(digest, token_data, ttl=token_data.exp - time.time())
+
+    _check_not_revoked(token_data)
+    return token_data
+
+
+def _check_not_revoked(token_data: TokenData) -> None:
+    """
+    Reject tokens on the in-memory denylist, without a database round trip
+    
+    Raises:
+        AppError: If the token has been revoked
+    """
+    if token_data.jti is not None and token_data.jti in token_denylist:
+        raise AppError(ErrorCodes.UNAUTHORIZED, "Token has been revoked!")
+
+
 class Auth:
     """
     Unified Authentication and Authorization class
     Handles both JWT token validation and role-based access control
     """
     
-    def __init__(self, required_role: UserRole):
+    def __init__(self, required_role: Optional[UserRole] = None):
         """
         Initialize Auth with role requirement
         
         Args:
-            required_role: Enforce role-based authorization
+            required_role: Enforce role-based authorization, or None to accept any role
         """
         self.required_role = required_role
     
@@ -59,29 +135,8 @@ class Auth:
         Raises:
             AppError: If token is invalid, expired, or missing
         """
-        token = credentials.credentials
-        
-        if not token:
-            raise AppError(ErrorCodes.BAD_REQUEST, "No token provided!")
-        
-        try:
-            # Verify the JWT token
-            payload = jwt.decode(
-                token, 
-                settings.access_token_secret_key, 
-                algorithms=[settings.access_token_algorithm]
-            )
-            
-            token_data = TokenData(**payload)
-            return token_data
-            
-        except ExpiredSignatureError:
-            raise AppError(ErrorCodes.UNAUTHORIZED, "Token is expired!")
-        except JWTError:
-            raise AppError(ErrorCodes.UNAUTHORIZED, "Invalid token!")
-        except Exception:
-            raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR, "JWT token error")
-    
+        return verify_token(credentials.credentials)
+
     def _authorize(self, user: TokenData) -> None:
         """
         Check if user has required role
@@ -95,5 +150,5 @@ class Auth:
         if not user:
             raise AppError(ErrorCodes.NOT_FOUND, "User not found!")
         
-        if user.role != self.required_role.value:
+        if self.required_role is not None and user.role != self.required_role.value:
             raise AppError(ErrorCodes.PERMISSION_NOT_GRANTED)
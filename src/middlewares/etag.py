@@ -0,0 +1,31 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Response, status
+
+
+def make_etag(*version: Any) -> str:
+    """Builds a strong ETag from the parts of a resource version stamp."""
+    digest = hashlib.blake2b(repr(version).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an `If-None-Match` header against an ETag.
+
+    Uses the weak comparison required for `If-None-Match`, so a `W/` prefix
+    added by an intermediary still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    """Builds an empty 304 response carrying the current ETag."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag})
@@ -0,0 +1,48 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.metrics import counter, histogram
+
+http_requests = counter("http_requests", "HTTP requests handled",
+                        ["method", "route", "status"])
+http_request_duration = histogram("http_request_duration_seconds",
+                                  "HTTP request latency",
+                                  ["method", "route", "status"])
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and records their latency, labelled by method, route
+    template (e.g. `/api/v1/subscribe/lecture/{course_id}`) and status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched
+            # paths share one label so they can't blow up the series count
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"),
+                      str(status))
+            http_requests.labels(*labels).inc()
+            http_request_duration.labels(*labels).observe(
+                time.perf_counter() - start)
@@ -0,0 +1,55 @@
+import os
+import random
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.profiler import profiler
+
+
+class ProfilerMiddleware:
+    """
+    Profiles requests that carry a valid signed `X-Profile` header, plus a
+    random `profiler_sample_rate` fraction of all requests, writing each
+    profile as folded stacks (the input of flamegraph.pl and speedscope).
+
+    Requests that aren't profiled only pay for a header lookup and a random
+    number.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        if profiler.secret:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    token = value.decode("latin-1")
+                    break
+        requested = profiler.accepts(token)
+        if not requested and random.random() >= profiler.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(f"{scope['method']} {scope['path']}")
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile(message: Message) -> None:
+            # Tell whoever asked where to find the profile
+            if message["type"] == "http.response.start" and requested:
+                MutableHeaders(scope=message)["X-Profile-File"] = os.path.basename(
+                    profile.path)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.finish(profile)
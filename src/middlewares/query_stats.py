@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.database import engine
+from src.configs.logger import get_logger
+from src.configs.settings import settings
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """
+    SQL statistics collected while handling a single request.
+
+    A request's `asyncio.to_thread` calls inherit its context, so several
+    threads may record into the same stats at once.
+    """
+    path: str = ""
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock,
+                                  repr=False,
+                                  compare=False)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements[statement] += 1
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_statement = statement
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats",
+                                                              default=None)
+
+# Callbacks notified with the stats of every finished request (used by tests)
+_observers: List[Callable[[QueryStats], None]] = []
+
+
+def _redact(parameters: Any) -> Any:
+    """Replaces bind parameter values with their type names outside development."""
+    if settings.environment == 'development':
+        return parameters
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(item) for item in parameters]
+    return type(parameters).__name__
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        logger.warning("Slow query",
+                       extra={
+                           "path": stats.path if stats else None,
+                           "duration_ms": round(elapsed * 1000, 2),
+                           "statement": statement,
+                           "parameters": _redact(parameters),
+                       })
+
+
+class QueryStatsMiddleware:
+    """
+    Records the number of SQL statements, the total database time and the
+    slowest statement of every HTTP request.
+
+    In development the numbers are exposed as `X-DB-*` response headers.
+    Statements repeated at least `n_plus_one_threshold` times within one
+    request are logged as possible N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp, expose_headers: bool = False):
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(path=scope["path"])
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.expose_headers:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.2f}"
+                headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            self._report(stats)
+
+    @staticmethod
+    def _report(stats: QueryStats) -> None:
+        for statement, count in stats.statements.items():
+            if count >= settings.n_plus_one_threshold:
+                logger.warning("Possible N+1 query",
+                               extra={
+                                   "path": stats.path,
+                                   "executions": count,
+                                   "statement": statement,
+                               })
+        for observer in _observers:
+            observer(stats)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int) -> Iterator[List[QueryStats]]:
+    """
+    Fails if any request handled inside the block runs more than
+    `max_queries` SQL statements.
+
+    Intended for tests, e.g.:
+
+        with assert_query_budget(2):
+            client.get("/api/v1/course/all")
+    """
+    recorded: List[QueryStats] = []
+    _observers.append(recorded.append)
+    try:
+        yield recorded
+    finally:
+        _observers.remove(recorded.append)
+
+    for stats in recorded:
+        assert stats.count <= max_queries, (
+            f"{stats.path} ran {stats.count} queries, budget is {max_queries}: "
+            f"{list(stats.statements)}")
@@ -0,0 +1,36 @@
+import math
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.limiter import track_rate_limit
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Adds the `RateLimit-Limit`, `RateLimit-Remaining` and `RateLimit-Reset`
+    headers to responses of rate limited routes, rejected ones included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_rate_limit() as holder:
+
+            async def send_with_headers(message: Message) -> None:
+                if message["type"] == "http.response.start" and holder.result:
+                    headers = MutableHeaders(scope=message)
+                    headers["RateLimit-Limit"] = str(holder.result.limit)
+                    headers["RateLimit-Remaining"] = str(
+                        holder.result.remaining)
+                    headers["RateLimit-Reset"] = str(
+                        math.ceil(holder.result.reset))
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,89 @@
+from sqlalchemy import event
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.database import engine
+from src.configs.tracing import activate, tracer
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    span = tracer.start_span(
+        f"db {statement.split(None, 1)[0].upper()}" if statement else "db",
+        "CLIENT", {
+            "db.system": engine.dialect.name,
+            "db.statement": statement
+        })
+    if span is not None:
+        conn.info.setdefault("trace_spans", []).append(span)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        span = spans.pop()
+        span.set_attribute("db.rows", cursor.rowcount)
+        span.end()
+
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get(
+        "trace_spans") if exception_context.connection else None
+    if spans:
+        span = spans.pop()
+        span.record_error(exception_context.original_exception)
+        span.end()
+
+
+class TracingMiddleware:
+    """
+    Runs every sampled request in a server span named after its method and
+    route template, continuing the caller's trace from a `traceparent`
+    header. Database statements and Mux calls made while handling the
+    request become child spans.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        span = tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"), {
+                "http.method": scope["method"],
+                "url.path": scope["path"],
+            })
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+        if not span.sampled:
+            # Only carries the trace context to outgoing calls
+            with activate(span):
+                await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.error = f"HTTP {message['status']}"
+            await send(message)
+
+        with activate(span):
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # Named before the span ends and is handed to the exporter
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+                    span.set_attribute("http.route", route.path)
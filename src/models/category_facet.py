@@ -0,0 +1,34 @@
+from sqlalchemy import String, ForeignKey, CheckConstraint, Float, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from src.configs.database import Base
+
+
+class CategoryFacet(Base):
+    """
+    Per-course lecture aggregates for each (category, subcategory) pair.
+
+    Maintained incrementally by `CoursesRepository.create_lecture`, so the
+    catalog facets are a GROUP BY over this small table instead of over
+    every lecture.
+    """
+    __tablename__ = "category_facets"
+
+    category: Mapped[str] = mapped_column(String(200), primary_key=True)
+    subcategory: Mapped[str] = mapped_column(String(200), primary_key=True)
+    course_id: Mapped[str] = mapped_column(String(36),
+                                           ForeignKey("courses.id",
+                                                      ondelete="CASCADE"),
+                                           primary_key=True)
+    lecture_count: Mapped[int] = mapped_column(Integer,
+                                               nullable=False,
+                                               default=0)
+    total_duration: Mapped[float] = mapped_column(Float,
+                                                  nullable=False,
+                                                  default=0.0)
+
+    __table_args__ = (
+        CheckConstraint("lecture_count >= 0",
+                        name="check_facet_lecture_count_non_negative"),
+        CheckConstraint("total_duration >= 0",
+                        name="check_facet_total_duration_non_negative"),
+    )
@@ -1,4 +1,5 @@
-from sqlalchemy import String, DateTime, ForeignKey, CheckConstraint, Float, Integer, Boolean, Column
+from sqlalchemy import String, DateTime, ForeignKey, CheckConstraint, Float, Integer, Boolean, Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from src.configs.database import Base
@@ -28,6 +29,14 @@ class Course(Base):
     updated_at: Mapped[Optional[DateTime]] = mapped_column(
         DateTime(timezone=True), onupdate=func.now())
 
+    # Full-text search document, generated by Postgres on every insert/update
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True))
+
     # Reverse relationship - enables courses.instructor access
     instructor = relationship("User", back_populates="courses")
 
@@ -55,4 +64,9 @@ class Course(Base):
         CheckConstraint(
             "(duration = 0 AND lectures_count = 0) OR (duration > 0 AND lectures_count > 0)",
             name="check_duration_lectures_consistency"),
+
+        # GIN index backing the full-text course search
+        Index("ix_courses_search_vector",
+              "search_vector",
+              postgresql_using="gin"),
     )
@@ -1,4 +1,5 @@
-from sqlalchemy import String, DateTime, ForeignKey, CheckConstraint, Float
+from sqlalchemy import String, DateTime, ForeignKey, CheckConstraint, Float, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from src.configs.database import Base
@@ -32,6 +33,15 @@ class Lecture(Base):
                                                  onupdate=func.now(),
                                                  nullable=True)
 
+    # Full-text search document, generated by Postgres on every insert/update
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(category, '') || ' ' || coalesce(subcategory, '')), 'C')",
+            persisted=True))
+
     # Reverse relationship - enables lecture.course access
     course = relationship("Course", back_populates="lectures")
 
@@ -51,4 +61,12 @@ class Lecture(Base):
                         name="check_category_not_empty"),
         CheckConstraint("length(trim(subcategory)) > 0",
                         name="check_subcategory_not_empty"),
+
+        # Drill-down listing by category and subcategory
+        Index("ix_lectures_category_subcategory", "category", "subcategory"),
+
+        # GIN index backing the full-text lecture search
+        Index("ix_lectures_search_vector",
+              "search_vector",
+              postgresql_using="gin"),
     )
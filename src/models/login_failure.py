@@ -0,0 +1,18 @@
+from sqlalchemy import String, Float, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from src.configs.database import Base
+
+
+class LoginFailure(Base):
+    """
+    Shared failed login counters, keyed by account or client IP. Times are
+    Unix timestamps; a `locked_until` in the past means no lockout.
+    """
+    __tablename__ = "login_failures"
+
+    key: Mapped[str] = mapped_column(String(320), primary_key=True)
+    failures: Mapped[int] = mapped_column(Integer, nullable=False)
+    locked_until: Mapped[float] = mapped_column(Float, nullable=False)
+    last_failure_at: Mapped[float] = mapped_column(Float,
+                                                   nullable=False,
+                                                   index=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import String, Float
+from sqlalchemy.orm import Mapped, mapped_column
+from src.configs.database import Base
+
+
+class RateLimitState(Base):
+    """
+    Shared rate limiter state: the GCRA theoretical arrival time of each
+    limited identity, as a Unix timestamp. A `tat` in the past means the
+    identity has its full burst available.
+    """
+    __tablename__ = "rate_limits"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    tat: Mapped[float] = mapped_column(Float, nullable=False, index=True)
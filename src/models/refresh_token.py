@@ -0,0 +1,31 @@
+from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, mapped_column
+from src.configs.database import Base
+from datetime import datetime
+from typing import Optional
+
+
+class RefreshToken(Base):
+    """
+    An opaque refresh token. Only its SHA-256 digest is stored; each use
+    revokes it and issues a replacement.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(36),
+                                         ForeignKey("users.id",
+                                                    ondelete="CASCADE"),
+                                         nullable=False,
+                                         index=True)
+    token_hash: Mapped[str] = mapped_column(String(64),
+                                            unique=True,
+                                            nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 nullable=False)
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True))
+
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,24 @@
+from sqlalchemy import String, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, mapped_column
+from src.configs.database import Base
+from datetime import datetime
+from typing import Optional
+
+
+class RevokedToken(Base):
+    """
+    An access token revoked before its expiry, identified by its `jti`.
+
+    Rows only matter until `expires_at`; after that the token is rejected
+    as expired anyway. Every worker mirrors the live rows in memory.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(String(36), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 nullable=False,
+                                                 index=True)
+
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
@@ -1,12 +1,16 @@
 from sqlalchemy.orm import Session
 from src.modules.auth.repository import AuthRepository
-from src.modules.auth.schemas import UserCreate, LoginResponse, LoginResponse, TokenData
-from src.modules.auth.utils import create_token
+from src.modules.auth.schemas import UserCreate, LoginResponse, LoginResponse, TokenData, UserImportResult, UserImportStatus
+from src.modules.auth.utils import create_token, create_refresh_token, hash_refresh_token, token_denylist, login_throttle
+from src.models.user import User
+from src.configs.settings import settings
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+from pydantic import ValidationError
+import uuid
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.configs.hashing import password_hasher
 
 class AuthController:
     def __init__(self, db: Session):
@@ -26,21 +30,15 @@ class AuthController:
             AppError: If user creation fails
         """
         try:
-            # Create user through repository
-            db_user = self.repository.create_user(user_data)
-
-            token_data = TokenData(
-                sub=db_user.id,
-                role=db_user.role.value
-            )
+            # Hash off the event loop, then create the user and their refresh
+            # token through repository in one transaction
+            hashed_password = await password_hasher.hash(user_data.password)
+            refresh_token, refresh_token_hash = create_refresh_token()
+            db_user = self.repository.create_user(user_data, hashed_password,
+                                                  refresh_token_hash,
+                                                  self._refresh_token_expiry())
 
-            token = create_token(token_data)
-            
-            return LoginResponse(
-                token=token,
-                first_name=db_user.first_name,
-                last_name=db_user.last_name,
-            )
+            return self._login_response(db_user, refresh_token)
             
         except AppError:
             # Re-raise known application errors
@@ -49,38 +47,217 @@ class AuthController:
             # Handle unexpected errors
             raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR, f"Unexpected error during user creation: {str(e)}")
     
-    async def authenticate_user(self, email: str, password: str) -> LoginResponse:
+    async def authenticate_user(self, email: str, password: str,
+                                client_ip: Optional[str] = None) -> LoginResponse:
         """
         Authenticate user and return login response with token
         
         Args:
             email: User email
             password: User password
+            client_ip: The client's IP address, for failed attempt throttling
             
         Returns:
             LoginResponse: Contains access token and user data
+
+        Raises:
+            AppError: If the credentials are invalid or the account or client is locked out
         """
-        # Get user by email
+        # Reject locked out accounts and clients before any hashing work
+        await login_throttle.check(email, client_ip)
+
+        # Get user by email, and verify password; unknown users cost the same
         user = self.repository.get_user_by_email(email)
-        if not user:
+        new_hash = None
+        if user:
+            verified, new_hash = await password_hasher.verify_and_update(
+                password, user.password)
+        else:
+            verified = await password_hasher.verify_dummy(password)
+
+        if not verified:
+            await login_throttle.record_failure(email, client_ip)
             raise AppError(ErrorCodes.BAD_REQUEST, "Invalid email or password")
+
+        await login_throttle.record_success(email)
+
+        # Upgrade hashes made with an older scheme or cost
+        if new_hash:
+            self.repository.update_password(user.id, new_hash)
         
-        # Verify password
-        if not pwd_context.verify(password, user.password):
-            raise AppError(ErrorCodes.BAD_REQUEST, "Invalid email or password")
+        return self._issue_tokens(user)
+
+    async def import_users(
+            self, records: Iterable[Tuple[int, dict]]) -> List[UserImportResult]:
+        """
+        Register many users at once, e.g. when onboarding a university
+        
+        Rows are validated like registrations and processed in batches:
+        emails and mobile numbers are checked against the database with one
+        query each per batch, passwords are hashed across the process pool,
+        and the users are inserted with one multi-row statement.
+        
+        Args:
+            records: (line number, raw user fields) pairs
+            
+        Returns:
+            List[UserImportResult]: The outcome of every row
+        """
+        results: List[UserImportResult] = []
+        seen_emails: Set[str] = set()
+        seen_mobile_numbers: Set[str] = set()
+        batch: List[Tuple[int, UserCreate]] = []
+
+        for line, record in records:
+            try:
+                user_data = UserCreate(**record)
+            except (ValidationError, AppError) as e:
+                error = e.detail if isinstance(e, AppError) else "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                    for err in e.errors())
+                results.append(
+                    UserImportResult(line=line,
+                                     email=record.get("email"),
+                                     status=UserImportStatus.INVALID,
+                                     error=error))
+                continue
+
+            # Duplicates within the file never reach the database
+            if user_data.email in seen_emails:
+                results.append(self._duplicate(line, user_data, "Email already registered"))
+                continue
+            if user_data.mobile_number in seen_mobile_numbers:
+                results.append(self._duplicate(line, user_data, "Mobile number already registered"))
+                continue
+            seen_emails.add(user_data.email)
+            seen_mobile_numbers.add(user_data.mobile_number)
+
+            batch.append((line, user_data))
+            if len(batch) >= settings.user_import_batch_size:
+                results.extend(await self._import_batch(batch))
+                batch = []
+
+        if batch:
+            results.extend(await self._import_batch(batch))
+
+        return sorted(results, key=lambda result: result.line)
+
+    async def _import_batch(
+            self, batch: List[Tuple[int, UserCreate]]) -> List[UserImportResult]:
+        results: List[UserImportResult] = []
+        existing_emails = self.repository.find_existing_emails(
+            [user_data.email for _, user_data in batch])
+        existing_mobile_numbers = self.repository.find_existing_mobile_numbers(
+            [user_data.mobile_number for _, user_data in batch])
+
+        new_users: List[Tuple[int, UserCreate]] = []
+        for line, user_data in batch:
+            if user_data.email in existing_emails:
+                results.append(self._duplicate(line, user_data, "Email already registered"))
+            elif user_data.mobile_number in existing_mobile_numbers:
+                results.append(self._duplicate(line, user_data, "Mobile number already registered"))
+            else:
+                new_users.append((line, user_data))
+
+        hashed_passwords = await password_hasher.hash_many(
+            [user_data.password for _, user_data in new_users])
+
+        created = self.repository.bulk_create_users([
+            dict(id=str(uuid.uuid4()),
+                 first_name=user_data.first_name,
+                 last_name=user_data.last_name,
+                 email=user_data.email,
+                 password=hashed_password,
+                 date_of_birth=user_data.date_of_birth,
+                 mobile_number=user_data.mobile_number,
+                 role=user_data.role)
+            for (_, user_data), hashed_password in zip(new_users, hashed_passwords)
+        ]) if new_users else set()
+
+        for line, user_data in new_users:
+            if user_data.email in created:
+                results.append(
+                    UserImportResult(line=line,
+                                     email=user_data.email,
+                                     status=UserImportStatus.CREATED))
+            else:
+                # Registered by someone else since the uniqueness check
+                results.append(self._duplicate(line, user_data, "Email or mobile number already registered"))
+
+        return results
+
+    @staticmethod
+    def _duplicate(line: int, user_data: UserCreate, error: str) -> UserImportResult:
+        return UserImportResult(line=line,
+                                email=user_data.email,
+                                status=UserImportStatus.DUPLICATE,
+                                error=error)
+
+    async def refresh_tokens(self, refresh_token: str) -> LoginResponse:
+        """
+        Exchange a refresh token for a new access and refresh token pair
+        
+        Args:
+            refresh_token: The refresh token from the last login or refresh
+            
+        Returns:
+            LoginResponse: Contains the new tokens and user data
+        """
+        new_refresh_token, new_refresh_token_hash = create_refresh_token()
+        user = self.repository.rotate_refresh_token(
+            hash_refresh_token(refresh_token), new_refresh_token_hash,
+            self._refresh_token_expiry())
+
+        return self._login_response(user, new_refresh_token)
+
+    async def logout(self, token_data: TokenData,
+                     refresh_token: Optional[str] = None) -> None:
+        """
+        Revoke the caller's access token and, if given, their refresh token
         
-        # Create token data
+        Args:
+            token_data: The authenticated access token's claims
+            refresh_token: Optional refresh token to revoke as well
+        """
+        if not token_data.jti:
+            raise AppError(ErrorCodes.BAD_REQUEST, "Token cannot be revoked")
+
+        if token_data.exp is not None:
+            expires_at = datetime.fromtimestamp(token_data.exp, tz=timezone.utc)
+        else:
+            expires_at = datetime.now(timezone.utc) + timedelta(
+                minutes=settings.access_token_expire_minutes)
+
+        self.repository.revoke_tokens(
+            token_data.sub, token_data.jti, expires_at,
+            hash_refresh_token(refresh_token) if refresh_token else None)
+
+        token_denylist.add(token_data.jti, expires_at.timestamp())
+
+    def _issue_tokens(self, user: User) -> LoginResponse:
+        refresh_token, refresh_token_hash = create_refresh_token()
+        self.repository.create_refresh_token(user.id, refresh_token_hash,
+                                             self._refresh_token_expiry())
+
+        return self._login_response(user, refresh_token)
+
+    @staticmethod
+    def _login_response(user: User, refresh_token: str) -> LoginResponse:
+        # Create token data and generate access token
         token_data = TokenData(
             sub=user.id,
             role=user.role.value
         )
-        
-        # Generate access token
         token = create_token(token_data)
-        
-        
+
         return LoginResponse(
             token=token,
+            refresh_token=refresh_token,
             first_name=user.first_name,
             last_name=user.last_name,
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def _refresh_token_expiry() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(
+            days=settings.refresh_token_expire_days)
\ No newline at end of file
@@ -1,13 +1,24 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+from src.configs.invalidation import invalidation_bus
 from src.models.user import User
+from src.models.refresh_token import RefreshToken
+from src.models.revoked_token import RevokedToken
 from src.modules.auth.schemas import UserCreate
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
 import uuid
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Registration errors for the unique indexes on the users table
+UNIQUE_INDEX_ERRORS = {
+    "ix_users_email": "Email already registered",
+    "ix_users_mobile_number": "Mobile number already registered",
+}
 
 
 class AuthRepository:
@@ -28,37 +39,173 @@ class AuthRepository:
         """Get user by ID"""
         return self.db.query(User).filter(User.id == user_id).first()
 
-    def create_user(self, user_data: UserCreate) -> User:
-        """Create a new user"""
-        # Check if user already exists
-        if self.get_user_by_email(user_data.email):
-            raise AppError(ErrorCodes.BAD_REQUEST, "Email already registered")
+    def create_user(self, user_data: UserCreate, hashed_password: str,
+                    refresh_token_hash: str, refresh_expires_at: datetime) -> User:
+        """
+        Create a new user with an already hashed password, along with their
+        first refresh token
 
-        if self.get_user_by_mobile(user_data.mobile_number):
-            raise AppError(ErrorCodes.BAD_REQUEST,
-                           "Mobile number already registered")
+        The user and the refresh token are inserted in one transaction with
+        a single commit: the unique indexes on `email` and `mobile_number`
+        reject duplicates, even between concurrent sign-ups, and the
+        violated index tells which field was taken. The returned user is
+        built from the inserted values, so nothing is read back.
+        """
+        fields = dict(id=str(uuid.uuid4()),
+                      first_name=user_data.first_name,
+                      last_name=user_data.last_name,
+                      email=user_data.email,
+                      password=hashed_password,
+                      date_of_birth=user_data.date_of_birth,
+                      mobile_number=user_data.mobile_number,
+                      role=user_data.role)
 
         try:
-            # Hash the password
-            hashed_password = pwd_context.hash(user_data.password)
-
-            # Create user instance
-            db_user = User(id=str(uuid.uuid4()),
-                           first_name=user_data.first_name,
-                           last_name=user_data.last_name,
-                           email=user_data.email,
-                           password=hashed_password,
-                           date_of_birth=user_data.date_of_birth,
-                           mobile_number=user_data.mobile_number,
-                           role=user_data.role)
-
-            self.db.add(db_user)
+            self.db.execute(insert(User).values(**fields))
+            self.db.execute(
+                insert(RefreshToken).values(id=str(uuid.uuid4()),
+                                            user_id=fields["id"],
+                                            token_hash=refresh_token_hash,
+                                            expires_at=refresh_expires_at))
             self.db.commit()
-            self.db.refresh(db_user)
+        except IntegrityError as e:
+            self.db.rollback()
+            diag = getattr(e.orig, "diag", None)
+            message = UNIQUE_INDEX_ERRORS.get(getattr(diag, "constraint_name", None))
+            if getattr(e.orig, "pgcode", None) == UNIQUE_VIOLATION and message:
+                raise AppError(ErrorCodes.BAD_REQUEST, message)
+            raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR,
+                           f"Failed to create user: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR,
+                           f"Failed to create user: {str(e)}")
+
+        return User(**fields)
 
-            return db_user
+    def find_existing_emails(self, emails: List[str]) -> Set[str]:
+        """Get which of the given emails are already registered"""
+        rows = self.db.query(User.email).filter(User.email.in_(emails)).all()
+        return {row.email for row in rows}
 
+    def find_existing_mobile_numbers(self, mobile_numbers: List[str]) -> Set[str]:
+        """Get which of the given mobile numbers are already registered"""
+        rows = self.db.query(User.mobile_number).filter(
+            User.mobile_number.in_(mobile_numbers)).all()
+        return {row.mobile_number for row in rows}
+
+    def bulk_create_users(self, users: List[dict]) -> Set[str]:
+        """
+        Insert users with one multi-row statement
+
+        Rows conflicting with an existing email or mobile number (registered
+        concurrently) are skipped by `ON CONFLICT DO NOTHING`.
+
+        Returns:
+            The emails of the users that were created
+        """
+        try:
+            stmt = insert(User).values(users).on_conflict_do_nothing().returning(User.email)
+            created = {row.email for row in self.db.execute(stmt)}
+            self.db.commit()
+            return created
         except Exception as e:
             self.db.rollback()
             raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR,
-                           f"Failed to create user: {str(e)}")
+                           f"Failed to import users: {str(e)}")
+
+    def update_password(self, user_id: str, hashed_password: str) -> None:
+        """Replace a user's password hash"""
+        self.db.query(User).filter(User.id == user_id).update(
+            {User.password: hashed_password}, synchronize_session=False)
+        self.db.commit()
+
+    def create_refresh_token(self, user_id: str, token_hash: str,
+                             expires_at: datetime) -> None:
+        """Store a new refresh token digest for a user"""
+        self.db.add(
+            RefreshToken(id=str(uuid.uuid4()),
+                         user_id=user_id,
+                         token_hash=token_hash,
+                         expires_at=expires_at))
+        self.db.commit()
+
+    def rotate_refresh_token(self, token_hash: str, new_token_hash: str,
+                             expires_at: datetime) -> User:
+        """
+        Revoke a refresh token and store its replacement
+
+        A token that was already rotated is being replayed, so every live
+        refresh token of its user is revoked as well.
+
+        Returns:
+            The token's user
+
+        Raises:
+            AppError: If the token is unknown, expired or already used
+        """
+        token = self.db.query(RefreshToken).filter(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.expires_at > func.now()).with_for_update().first()
+
+        if not token:
+            raise AppError(ErrorCodes.UNAUTHORIZED, "Invalid refresh token!")
+
+        if token.revoked_at is not None:
+            self.db.query(RefreshToken).filter(
+                RefreshToken.user_id == token.user_id,
+                RefreshToken.revoked_at.is_(None)).update(
+                    {RefreshToken.revoked_at: func.now()},
+                    synchronize_session=False)
+            self.db.commit()
+            raise AppError(ErrorCodes.UNAUTHORIZED, "Invalid refresh token!")
+
+        token.revoked_at = func.now()
+        self.db.add(
+            RefreshToken(id=str(uuid.uuid4()),
+                         user_id=token.user_id,
+                         token_hash=new_token_hash,
+                         expires_at=expires_at))
+
+        user = self.get_user_by_id(token.user_id)
+        self.db.commit()
+
+        return user
+
+    def revoke_tokens(self, user_id: str, jti: str, expires_at: datetime,
+                      refresh_token_hash: Optional[str] = None) -> None:
+        """
+        Revoke an access token, and optionally one of the user's refresh
+        tokens, in one transaction. Other workers add the access token to
+        their denylist once it commits.
+        """
+        self.db.execute(
+            insert(RevokedToken).values(
+                jti=jti, expires_at=expires_at).on_conflict_do_nothing(
+                    index_elements=[RevokedToken.jti]))
+        invalidation_bus.publish(self.db,
+                                 "revoked_token",
+                                 jti,
+                                 "created",
+                                 expires_at=expires_at.timestamp())
+
+        if refresh_token_hash:
+            self.db.query(RefreshToken).filter(
+                RefreshToken.user_id == user_id,
+                RefreshToken.token_hash == refresh_token_hash,
+                RefreshToken.revoked_at.is_(None)).update(
+                    {RefreshToken.revoked_at: func.now()},
+                    synchronize_session=False)
+
+        # Revocations only matter until the token expires
+        self.db.query(RevokedToken).filter(
+            RevokedToken.expires_at <= func.now()).delete(
+                synchronize_session=False)
+
+        self.db.commit()
+
+    def get_revoked_tokens(self) -> List[Tuple[str, float]]:
+        """Get (jti, expires_at timestamp) of revoked tokens not yet expired"""
+        rows = self.db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+            RevokedToken.expires_at > func.now()).all()
+        return [(row.jti, row.expires_at.timestamp()) for row in rows]
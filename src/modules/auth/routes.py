@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, status, Request
 from sqlalchemy.orm import Session
 from src.configs.database import get_db
 from src.modules.auth.controller import AuthController
-from src.modules.auth.schemas import UserCreate, LoginResponse, UserLogin, LoginResponse
+from src.modules.auth.schemas import UserCreate, LoginResponse, UserLogin, LoginResponse, RefreshRequest, LogoutRequest, TokenData
 from src.configs.limiter import limiter
+from src.middlewares.auth import Auth
 
 router = APIRouter()
 
@@ -54,5 +55,44 @@ async def login_user(login_data: UserLogin,
     Returns access token and user information
     """
     controller = AuthController(db)
-    return await controller.authenticate_user(login_data.email,
-                                              login_data.password)
+    return await controller.authenticate_user(
+        login_data.email, login_data.password,
+        request.client.host if request.client else None)
+
+
+@router.post("/refresh",
+             response_model=LoginResponse,
+             status_code=status.HTTP_200_OK,
+             summary="Refresh tokens",
+             description="Exchange a refresh token for a new token pair")
+@limiter.limit("10/minute")
+async def refresh_tokens(refresh_data: RefreshRequest,
+                         request: Request,
+                         db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access and refresh token pair
+    
+    - **refresh_token**: Refresh token from the last login or refresh
+    
+    The refresh token is single use; reusing one revokes all of the user's refresh tokens
+    """
+    controller = AuthController(db)
+    return await controller.refresh_tokens(refresh_data.refresh_token)
+
+
+@router.post("/logout",
+             status_code=status.HTTP_204_NO_CONTENT,
+             summary="User logout",
+             description="Revoke the current access token and a refresh token")
+@limiter.limit("10/minute")
+async def logout_user(request: Request,
+                      logout_data: LogoutRequest = LogoutRequest(),
+                      token_data: TokenData = Depends(Auth()),
+                      db: Session = Depends(get_db)):
+    """
+    Revoke the current access token
+    
+    - **refresh_token**: Optional refresh token to revoke as well
+    """
+    controller = AuthController(db)
+    await controller.logout(token_data, logout_data.refresh_token)
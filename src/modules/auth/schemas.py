@@ -1,4 +1,5 @@
 from typing import Optional
+from enum import Enum
 from pydantic import BaseModel, EmailStr, Field, validator
 from src.models.user import UserRole
 from datetime import datetime
@@ -59,16 +60,41 @@ class UserCreate(BaseModel):
 
 class LoginResponse(BaseModel):
     token: str
+    refresh_token: str
     first_name: str
     last_name: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
 class TokenData(BaseModel):
     sub: str
     role: str
     exp: Optional[int] = None  # Expiration timestamp
+    jti: Optional[str] = None  # Unique token ID, used for revocation
 
 
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+
+
+class UserImportStatus(str, Enum):
+    """Outcome of a single row in a bulk user import."""
+    CREATED = "created"
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+
+
+class UserImportResult(BaseModel):
+    """Schema for the outcome of a single imported row."""
+    line: int
+    email: Optional[str] = None
+    status: UserImportStatus
+    error: Optional[str] = None
@@ -1,7 +1,26 @@
 from datetime import datetime, timedelta, timezone
 from src.modules.auth.schemas import TokenData
+from src.configs.invalidation import invalidation_bus
+from src.configs.cache import TTLCache
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
 from jose import jwt
 from src.configs.settings import settings
+from src.configs.database import SessionLocal
+from src.configs.logger import get_logger
+from src.models.login_failure import LoginFailure
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+import asyncio
+import hashlib
+import secrets
+import time
+import uuid
+
+T = TypeVar("T")
+
+logger = get_logger(__name__)
 
 def create_token(data: TokenData) -> str:
     """
@@ -19,8 +38,254 @@ def create_token(data: TokenData) -> str:
     # Use default expiration from settings (e.g., 120 minutes)
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     
-    # Add expiration to token payload
-    data_copy.update({"exp": expire})
+    # Add expiration and a unique ID, so the token can be revoked, to token payload
+    data_copy.update({"exp": expire, "jti": str(uuid.uuid4())})
     
     token = jwt.encode(data_copy, settings.access_token_secret_key, algorithm=settings.access_token_algorithm)
-    return token
\ No newline at end of file
+    return token
+
+
+def create_refresh_token() -> Tuple[str, str]:
+    """
+    Create an opaque refresh token
+
+    Returns:
+        Tuple[str, str]: (token, digest) - only the digest is stored
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Return the SHA-256 hex digest a refresh token is stored under"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenDenylist:
+    """
+    In-memory mirror of the revoked access tokens that have not expired yet.
+
+    Maps each revoked `jti` to its expiry timestamp, so membership checks
+    are a dict lookup. Expired entries are pruned as new ones arrive.
+    """
+
+    def __init__(self, prune_every: int = 1000):
+        self._expiries: Dict[str, float] = {}
+        self._prune_every = prune_every
+        self._added = 0
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._expiries
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._expiries[jti] = expires_at
+        self._added += 1
+        if self._added % self._prune_every == 0:
+            self._prune()
+
+    def load(self, tokens: Iterable[Tuple[str, float]]) -> None:
+        """Replace the list with the given (jti, expires_at) pairs"""
+        self._expiries = dict(tokens)
+
+    def _prune(self) -> None:
+        now = time.time()
+        for jti in [jti for jti, expires_at in self._expiries.items() if expires_at <= now]:
+            self._expiries.pop(jti, None)
+
+
+token_denylist = TokenDenylist()
+
+
+def _lockout_seconds(failures: int, threshold: int) -> float:
+    """The lockout after `failures` failures, doubling past the threshold up to the maximum"""
+    # The exponent is capped: counters can grow without bound, and 2**1024
+    # overflows a float long after the maximum is reached
+    return min(
+        settings.login_lockout_base_seconds * 2**min(failures - threshold, 32),
+        settings.login_lockout_max_seconds)
+
+
+class MemoryLoginFailures:
+    """Failure counters kept in this process. Only exact with a single worker."""
+
+    blocking = False
+
+    def __init__(self):
+        self._failures = TTLCache("login_failures",
+                                  max_size=settings.login_throttle_cache_size,
+                                  ttl=settings.login_failure_window_seconds)
+
+    def locked_until(self, keys: List[str]) -> float:
+        return max((entry[1] for entry in map(self._failures.peek, keys)
+                    if entry is not None),
+                   default=0.0)
+
+    def record_failure(self, key: str, threshold: int, now: float) -> None:
+        failures, locked_until = self._failures.peek(key) or (0, 0.0)
+        failures += 1
+        if failures >= threshold:
+            locked_until = now + _lockout_seconds(failures, threshold)
+        self._failures.set(key, (failures, locked_until))
+
+    def reset(self, key: str) -> None:
+        self._failures.pop(key)
+
+
+class PostgresLoginFailures:
+    """
+    Failure counters shared by every worker through the `login_failures`
+    table, so the thresholds hold for the whole server.
+
+    Each failure is a single `INSERT ... ON CONFLICT DO UPDATE` that counts
+    it and extends the lockout atomically. A counter whose last failure is
+    older than the failure window starts over, and such rows are deleted
+    now and then.
+    """
+
+    blocking = True
+
+    def __init__(self, prune_every: int = 1000):
+        self._prune_every = prune_every
+        self._calls = 0
+
+    def locked_until(self, keys: List[str]) -> float:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(LoginFailure.locked_until)).filter(
+                LoginFailure.key.in_(keys)).scalar() or 0.0
+        finally:
+            db.close()
+
+    def record_failure(self, key: str, threshold: int, now: float) -> None:
+        window_start = now - settings.login_failure_window_seconds
+        failures = case((LoginFailure.last_failure_at < window_start, 1),
+                        else_=LoginFailure.failures + 1)
+        stmt = insert(LoginFailure).values(
+            key=key,
+            failures=1,
+            locked_until=now +
+            _lockout_seconds(1, threshold) if threshold <= 1 else 0.0,
+            last_failure_at=now).on_conflict_do_update(
+                index_elements=[LoginFailure.key],
+                set_={
+                    "failures":
+                    failures,
+                    "locked_until":
+                    case((failures >= threshold, now + func.least(
+                        settings.login_lockout_base_seconds *
+                        func.power(2, func.least(failures - threshold, 32)),
+                        settings.login_lockout_max_seconds)),
+                         else_=LoginFailure.locked_until),
+                    "last_failure_at":
+                    now,
+                })
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+
+            # Counters past the window carry no state; drop them now and then
+            self._calls += 1
+            if self._calls % self._prune_every == 0:
+                db.query(LoginFailure).filter(
+                    LoginFailure.last_failure_at < window_start,
+                    LoginFailure.locked_until < now).delete(
+                        synchronize_session=False)
+
+            db.commit()
+        finally:
+            db.close()
+
+    def reset(self, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(LoginFailure).filter(LoginFailure.key == key).delete(
+                synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class LoginThrottle:
+    """
+    Failed login counters per account and per client IP.
+
+    Once a key reaches its failure threshold it is locked out, for twice as
+    long after every further failure. The lockout is checked before any
+    password hashing, so repeated guessing costs no hashing CPU. Counters
+    are forgotten after a quiet window. With the Postgres backend (the
+    default, following `rate_limit_backend`) the counters are shared by
+    every worker; the memory backend keeps them per process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def check(self, email: str, client_ip: str | None) -> None:
+        """
+        Reject the attempt if the account or the client is locked out
+        
+        Raises:
+            AppError: 429 with a Retry-After header while locked out
+        """
+        now = time.time()
+        try:
+            locked_until = await self._call(self.backend.locked_until,
+                                            self._keys(email, client_ip))
+        except Exception:
+            # Fail open: the login itself still needs the database
+            logger.exception("Login throttle backend failed")
+            return
+
+        if locked_until > now:
+            retry_after = str(int(locked_until - now) + 1)
+            raise AppError(ErrorCodes.TOO_MANY_REQUESTS,
+                           f"Too many failed login attempts, try again in {retry_after} seconds",
+                           headers={"Retry-After": retry_after})
+
+    async def record_failure(self, email: str, client_ip: str | None) -> None:
+        """Count a failed attempt and extend the lockout once over the threshold"""
+        now = time.time()
+        thresholds = (settings.login_account_max_failures, settings.login_ip_max_failures)
+        for key, threshold in zip(self._keys(email, client_ip), thresholds):
+            try:
+                await self._call(self.backend.record_failure, key, threshold,
+                                 now)
+            except Exception:
+                logger.exception("Login throttle backend failed")
+
+    async def record_success(self, email: str) -> None:
+        """Reset the account's counter; the client's keeps counting"""
+        try:
+            await self._call(self.backend.reset, self._keys(email, None)[0])
+        except Exception:
+            logger.exception("Login throttle backend failed")
+
+    async def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    @staticmethod
+    def _keys(email: str, client_ip: str | None) -> List[str]:
+        return [f"account:{email.lower()}", f"ip:{client_ip or 'unknown'}"]
+
+
+def _create_login_failures():
+    if settings.rate_limit_backend == "postgres":
+        return PostgresLoginFailures()
+    if settings.rate_limit_backend == "memory":
+        return MemoryLoginFailures()
+    raise ValueError(
+        f"Unknown rate limit backend: {settings.rate_limit_backend}")
+
+
+login_throttle = LoginThrottle(_create_login_failures())
+
+# Tokens revoked through other workers
+invalidation_bus.subscribe(
+    "revoked_token",
+    lambda event: token_denylist.add(event.id, event.data["expires_at"]))
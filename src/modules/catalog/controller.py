@@ -0,0 +1,114 @@
+import base64
+import json
+import math
+from sqlalchemy.orm import Session
+from src.modules.catalog.repository import CatalogRepository
+from src.modules.catalog.schemas import (SearchHit, SearchResponse,
+                                        AutocompleteSuggestion, CategoryFacet,
+                                        SubcategoryFacet)
+from src.modules.instructor.courses.schemas import Page, CourseListItemResponse
+from src.modules.catalog.utils import title_index
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
+from typing import Dict, List, Optional, Tuple
+
+
+class CatalogController:
+    """Controller for searching and browsing the public catalog."""
+
+    def __init__(self, db: Session):
+        self.repository = CatalogRepository(db)
+
+    async def search(self,
+                     query: str,
+                     limit: int,
+                     cursor: Optional[str] = None,
+                     premium: Optional[bool] = None,
+                     category: Optional[str] = None,
+                     instructor_id: Optional[str] = None) -> SearchResponse:
+        """
+        Searches courses and lectures and returns one keyset-paginated page.
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+
+        # Fetch one extra row to know whether there is a next page
+        rows = self.repository.search(query,
+                                      limit + 1,
+                                      premium=premium,
+                                      category=category,
+                                      instructor_id=instructor_id,
+                                      after=after)
+
+        hits = [SearchHit.model_validate(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = hits[-1]
+            next_cursor = self._encode_cursor(last.rank, last.id)
+
+        return SearchResponse(items=hits, next_cursor=next_cursor)
+
+    def load_title_index(self) -> None:
+        """Builds the in-memory autocomplete index from the courses table."""
+        title_index.build(
+            (row.id, row.title, row.subscribers)
+            for row in self.repository.get_course_titles_with_subscribers())
+
+    @staticmethod
+    def autocomplete(prefix: str, limit: int) -> List[AutocompleteSuggestion]:
+        """Suggests course titles for a prefix without touching the database."""
+        return [
+            AutocompleteSuggestion(course_id=course_id, title=title)
+            for course_id, title in title_index.suggest(prefix, limit)
+        ]
+
+    async def get_facets(self) -> List[CategoryFacet]:
+        """Returns category -> subcategory lecture aggregates."""
+        totals = []
+        subcategories: Dict[str, List[SubcategoryFacet]] = {}
+
+        for row in self.repository.get_category_facets():
+            if row.is_category_total:
+                totals.append(row)
+            else:
+                subcategories.setdefault(row.category, []).append(
+                    SubcategoryFacet(subcategory=row.subcategory,
+                                     lecture_count=row.lecture_count,
+                                     total_duration=row.total_duration,
+                                     course_count=row.course_count))
+
+        return [
+            CategoryFacet(category=row.category,
+                          lecture_count=row.lecture_count,
+                          total_duration=row.total_duration,
+                          course_count=row.course_count,
+                          subcategories=subcategories.get(row.category, []))
+            for row in totals
+        ]
+
+    async def get_courses_by_category(
+            self, category: str, subcategory: Optional[str], page: int,
+            size: int) -> Page[CourseListItemResponse]:
+        """Lists the courses in a category facet as a paginated response."""
+        courses, total = self.repository.get_courses_by_category(
+            category, subcategory, page, size)
+
+        return Page(items=[
+            CourseListItemResponse.from_row(course) for course in courses
+        ],
+                    total=total,
+                    page=page,
+                    size=size,
+                    pages=math.ceil(total / size) if size > 0 else 0)
+
+    @staticmethod
+    def _encode_cursor(rank: float, hit_id: str) -> str:
+        raw = json.dumps([rank, hit_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, str]:
+        try:
+            rank, hit_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return float(rank), str(hit_id)
+        except Exception:
+            raise AppError(ErrorCodes.BAD_REQUEST, "Invalid search cursor")
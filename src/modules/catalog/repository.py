@@ -0,0 +1,146 @@
+from sqlalchemy import Double, Row, and_, cast, distinct, func, literal, null, or_, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from src.models.course import Course
+from src.models.lecture import Lecture
+from src.models.subscription import Subscription
+from src.models.user import User
+from src.models.category_facet import CategoryFacet
+from src.modules.instructor.courses.repository import COURSE_LIST_COLUMNS
+from typing import List, Optional, Tuple
+
+SEARCH_LANGUAGE = "english"
+
+
+class CatalogRepository:
+    """Repository for read-only catalog queries (search and browsing)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self,
+               query: str,
+               limit: int,
+               premium: Optional[bool] = None,
+               category: Optional[str] = None,
+               instructor_id: Optional[str] = None,
+               after: Optional[Tuple[float, str]] = None) -> List[Row]:
+        """
+        Full-text search over courses and lectures, ranked by relevance.
+
+        Both tables are matched against their GIN-indexed `search_vector`
+        column. Results are ordered by (rank desc, id) and paginated with a
+        keyset: `after` is the (rank, id) of the last hit of the previous page.
+        A `category` filter only applies to lectures, so course hits are
+        skipped when it is set.
+        """
+        ts_query = func.websearch_to_tsquery(SEARCH_LANGUAGE, query)
+
+        lectures = select(
+            literal("lecture").label("type"),
+            Lecture.id.label("id"),
+            Lecture.course_id.label("course_id"),
+            Lecture.title.label("title"),
+            Lecture.description.label("description"),
+            Lecture.category.label("category"),
+            Lecture.subcategory.label("subcategory"),
+            Course.premium.label("premium"),
+            cast(func.ts_rank(Lecture.search_vector, ts_query),
+                 Double).label("rank"),
+        ).join(Course, Lecture.course_id == Course.id).where(
+            Lecture.search_vector.op("@@")(ts_query))
+
+        courses = select(
+            literal("course").label("type"),
+            Course.id.label("id"),
+            Course.id.label("course_id"),
+            Course.title.label("title"),
+            Course.description.label("description"),
+            null().label("category"),
+            null().label("subcategory"),
+            Course.premium.label("premium"),
+            cast(func.ts_rank(Course.search_vector, ts_query),
+                 Double).label("rank"),
+        ).where(Course.search_vector.op("@@")(ts_query))
+
+        if premium is not None:
+            lectures = lectures.where(Course.premium == premium)
+            courses = courses.where(Course.premium == premium)
+        if instructor_id is not None:
+            lectures = lectures.where(Course.instructor_id == instructor_id)
+            courses = courses.where(Course.instructor_id == instructor_id)
+        if category is not None:
+            lectures = lectures.where(Lecture.category == category)
+
+        hits = (lectures if category is not None else union_all(
+            lectures, courses)).subquery()
+
+        stmt = select(hits).order_by(hits.c.rank.desc(), hits.c.id)
+        if after is not None:
+            rank, hit_id = after
+            stmt = stmt.where(
+                or_(hits.c.rank < rank,
+                    and_(hits.c.rank == rank, hits.c.id > hit_id)))
+
+        return list(self.db.execute(stmt.limit(limit)).all())
+
+    def get_course_titles_with_subscribers(self) -> List[Row]:
+        """
+        Fetches every course's (id, title, subscriber count) to build the
+        autocomplete index.
+        """
+        return self.db.query(
+            Course.id, Course.title,
+            func.count(Subscription.id).label("subscribers")).outerjoin(
+                Subscription,
+                Subscription.course_id == Course.id).group_by(
+                    Course.id, Course.title).all()
+
+    def get_category_facets(self) -> List[Row]:
+        """
+        Aggregates the category facets table per (category, subcategory) and
+        per category in a single GROUPING SETS query.
+
+        Rows where `is_category_total` is set hold the category-wide totals.
+        """
+        return self.db.query(
+            CategoryFacet.category, CategoryFacet.subcategory,
+            func.grouping(CategoryFacet.subcategory).label(
+                "is_category_total"),
+            func.sum(CategoryFacet.lecture_count).label("lecture_count"),
+            func.sum(CategoryFacet.total_duration).label("total_duration"),
+            func.count(distinct(
+                CategoryFacet.course_id)).label("course_count")).group_by(
+                    func.grouping_sets(
+                        tuple_(CategoryFacet.category,
+                               CategoryFacet.subcategory),
+                        tuple_(CategoryFacet.category))).order_by(
+                            CategoryFacet.category,
+                            CategoryFacet.subcategory).all()
+
+    def get_courses_by_category(self, category: str,
+                                subcategory: Optional[str], page: int,
+                                size: int) -> Tuple[List[Row], int]:
+        """
+        Fetches the courses with lectures in a category (and optionally a
+        subcategory), with pagination.
+        """
+        if page < 1:
+            page = 1
+        if size < 1:
+            size = 10
+
+        facets = select(CategoryFacet.course_id).where(
+            CategoryFacet.category == category)
+        if subcategory is not None:
+            facets = facets.where(CategoryFacet.subcategory == subcategory)
+
+        total = self.db.execute(
+            select(func.count(distinct(
+                facets.subquery().c.course_id)))).scalar() or 0
+
+        courses = self.db.query(*COURSE_LIST_COLUMNS).join(
+            User, Course.instructor_id == User.id).filter(
+                Course.id.in_(facets)).order_by(Course.id).offset(
+                    (page - 1) * size).limit(size).all()
+
+        return courses, total
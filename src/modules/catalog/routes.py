@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+from src.configs.database import get_db
+from src.modules.catalog.controller import CatalogController
+from src.modules.catalog.schemas import SearchResponse, AutocompleteSuggestion, CategoryFacet
+from src.modules.instructor.courses.schemas import Page, CourseListItemResponse
+from typing import List, Optional
+from src.configs.limiter import limiter
+
+router = APIRouter()
+
+
+@router.get(
+    "/search",
+    response_model=SearchResponse,
+    summary="Search Courses and Lectures",
+    description=
+    "Full-text search over course titles/descriptions and lecture titles, descriptions, categories and subcategories."
+)
+@limiter.limit("50/minute")
+async def search(
+    request: Request,
+    db: Session = Depends(get_db),
+    q: str = Query(...,
+                   min_length=1,
+                   max_length=200,
+                   description="Search query (supports quotes, OR and -)"),
+    premium: Optional[bool] = Query(
+        None, description="Only return premium or free content"),
+    category: Optional[str] = Query(
+        None, description="Only return lectures in this category"),
+    instructor_id: Optional[str] = Query(
+        None, description="Only return content by this instructor"),
+    limit: int = Query(20, ge=1, le=100, description="Number of hits per page"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned by the previous page")):
+    """
+    Searches the catalog, ranking hits by relevance.
+
+    Pages are chained with `next_cursor` instead of page numbers, so deep
+    pages cost the same as the first one.
+    """
+    controller = CatalogController(db)
+    return await controller.search(q,
+                                   limit,
+                                   cursor=cursor,
+                                   premium=premium,
+                                   category=category,
+                                   instructor_id=instructor_id)
+
+
+@router.get(
+    "/autocomplete",
+    response_model=List[AutocompleteSuggestion],
+    summary="Autocomplete Course Titles",
+    description=
+    "Suggests course titles matching a typed prefix, most subscribed first.")
+@limiter.limit("600/minute")
+async def autocomplete(
+    request: Request,
+    q: str = Query(...,
+                   min_length=1,
+                   max_length=200,
+                   description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=10, description="Number of suggestions")):
+    """
+    Suggests course titles whose title, or any word in it, starts with `q`.
+
+    Served from an in-memory index, so it is safe to call on every keystroke.
+    """
+    return CatalogController.autocomplete(q, limit)
+
+
+@router.get(
+    "/facets",
+    response_model=List[CategoryFacet],
+    summary="Get Category Facets",
+    description=
+    "Lecture count, total duration and course count per category and subcategory."
+)
+@limiter.limit("50/minute")
+async def get_facets(request: Request, db: Session = Depends(get_db)):
+    """
+    Returns every category with its subcategories and their aggregates.
+
+    Served from the precomputed category facets table, not from the lectures.
+    """
+    controller = CatalogController(db)
+    return await controller.get_facets()
+
+
+@router.get(
+    "/facets/courses",
+    response_model=Page[CourseListItemResponse],
+    summary="Get Courses in a Category",
+    description=
+    "Fetches a paginated list of the courses with lectures in a category or subcategory."
+)
+@limiter.limit("50/minute")
+async def get_courses_by_category(
+    request: Request,
+    db: Session = Depends(get_db),
+    category: str = Query(..., min_length=1, description="Lecture category"),
+    subcategory: Optional[str] = Query(
+        None, min_length=1, description="Lecture subcategory"),
+    page: int = Query(1, ge=1, description="Page number to retrieve"),
+    size: int = Query(10,
+                      ge=1,
+                      le=100,
+                      description="Number of courses per page")):
+    controller = CatalogController(db)
+    return await controller.get_courses_by_category(category, subcategory,
+                                                    page, size)
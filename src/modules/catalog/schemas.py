@@ -0,0 +1,51 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class SearchHit(BaseModel):
+    """A single ranked course or lecture matching a search query."""
+    type: Literal["course", "lecture"] = Field(
+        ..., description="Whether the hit is a course or a lecture.")
+    id: str
+    course_id: str = Field(...,
+                           description="The course the hit belongs to.")
+    title: str
+    description: str
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    premium: bool
+    rank: float = Field(..., description="Relevance score of the hit.")
+
+    class Config:
+        from_attributes = True
+
+
+class SearchResponse(BaseModel):
+    """A page of search hits with a cursor for the next page."""
+    items: List[SearchHit]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Opaque cursor to fetch the next page, if there is one.")
+
+
+class AutocompleteSuggestion(BaseModel):
+    """A course title suggested for a typed prefix."""
+    course_id: str
+    title: str
+
+
+class SubcategoryFacet(BaseModel):
+    """Aggregates of the lectures in one subcategory."""
+    subcategory: str
+    lecture_count: int
+    total_duration: float
+    course_count: int
+
+
+class CategoryFacet(BaseModel):
+    """Aggregates of the lectures in one category, broken down by subcategory."""
+    category: str
+    lecture_count: int
+    total_duration: float
+    course_count: int
+    subcategories: List[SubcategoryFacet]
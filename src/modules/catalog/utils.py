@@ -0,0 +1,154 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from src.configs.invalidation import InvalidationEvent, invalidation_bus
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# Separates the indexed text from the course id inside a sorted key
+_KEY_SEPARATOR = "\x00"
+
+
+def normalize_title(text: str) -> str:
+    """Lower-cases text and collapses punctuation and whitespace to single spaces."""
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+class TitleIndex:
+    """
+    In-memory prefix index of course titles, weighted by subscriber count.
+
+    Every word of a normalized title starts one key in a sorted array, so a
+    prefix lookup is a `bisect` followed by a scan over the matching range.
+    The top suggestions of recently queried prefixes are memoized; adding a
+    course evicts the memoized prefixes it affects, while subscriber count
+    increments update them in place because weights only ever grow.
+    """
+
+    def __init__(self,
+                 max_suggestions: int = 10,
+                 max_cached_prefixes: int = 10_000):
+        self.max_suggestions = max_suggestions
+        self.max_cached_prefixes = max_cached_prefixes
+        self._keys: List[str] = []
+        self._titles: Dict[str, str] = {}
+        self._weights: Dict[str, int] = {}
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def build(self, courses: Iterable[Tuple[str, str, int]]) -> None:
+        """Replaces the index with (course_id, title, subscribers) tuples."""
+        keys: List[str] = []
+        titles: Dict[str, str] = {}
+        weights: Dict[str, int] = {}
+        for course_id, title, subscribers in courses:
+            titles[course_id] = title
+            weights[course_id] = subscribers
+            keys.extend(self._keys_for(course_id, title))
+        keys.sort()
+
+        with self._lock:
+            self._keys = keys
+            self._titles = titles
+            self._weights = weights
+            self._cache.clear()
+
+    def add(self, course_id: str, title: str, subscribers: int = 0) -> None:
+        """Indexes a new course. Adding an already indexed course is a no-op."""
+        with self._lock:
+            if course_id in self._titles:
+                return
+            self._titles[course_id] = title
+            self._weights[course_id] = subscribers
+            for key in self._keys_for(course_id, title):
+                bisect.insort(self._keys, key)
+                self._evict_prefixes_of(key)
+
+    def increment(self, course_id: str, subscribers: int = 1) -> None:
+        """Adds new subscribers to an indexed course's weight."""
+        with self._lock:
+            if course_id not in self._titles:
+                return
+            weight = self._weights[course_id] + subscribers
+            self._weights[course_id] = weight
+
+            for key in self._keys_for(course_id, self._titles[course_id]):
+                text = key.split(_KEY_SEPARATOR, 1)[0]
+                for end in range(1, len(text) + 1):
+                    suggestions = self._cache.get(text[:end])
+                    if suggestions is not None:
+                        self._promote(suggestions, course_id, weight)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """Returns up to `limit` (course_id, title) pairs, heaviest first."""
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            suggestions = self._cache.get(prefix)
+            if suggestions is None:
+                suggestions = self._lookup(prefix)
+                self._cache[prefix] = suggestions
+                if len(self._cache) > self.max_cached_prefixes:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(prefix)
+
+            return [(course_id, self._titles[course_id])
+                    for course_id in suggestions[:limit]]
+
+    def _lookup(self, prefix: str) -> List[str]:
+        candidates = set()
+        index = bisect.bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            candidates.add(self._keys[index].rsplit(_KEY_SEPARATOR, 1)[1])
+            index += 1
+        return heapq.nlargest(self.max_suggestions,
+                              candidates,
+                              key=self._weights.__getitem__)
+
+    def _promote(self, suggestions: List[str], course_id: str,
+                 weight: int) -> None:
+        if course_id not in suggestions:
+            # A full list only changes if the course now outweighs its last entry
+            if (len(suggestions) < self.max_suggestions
+                    or weight <= self._weights[suggestions[-1]]):
+                return
+            suggestions[-1] = course_id
+        suggestions.sort(key=self._weights.__getitem__, reverse=True)
+
+    def _evict_prefixes_of(self, key: str) -> None:
+        text = key.split(_KEY_SEPARATOR, 1)[0]
+        for end in range(1, len(text) + 1):
+            self._cache.pop(text[:end], None)
+
+    @staticmethod
+    def _keys_for(course_id: str, title: str) -> List[str]:
+        text = normalize_title(title)
+        starts = [0] + [i + 1 for i, char in enumerate(text) if char == " "]
+        return [f"{text[start:]}{_KEY_SEPARATOR}{course_id}" for start in starts]
+
+
+title_index = TitleIndex()
+
+
+def _on_course_event(event: InvalidationEvent) -> None:
+    if event.op == "created":
+        title_index.add(event.id, event.data["title"])
+
+
+def _on_subscription_event(event: InvalidationEvent) -> None:
+    title_index.increment(event.id, event.data.get("count", 1))
+
+
+# Keep the autocomplete index in step with writes made by other workers
+invalidation_bus.subscribe("course", _on_course_event)
+invalidation_bus.subscribe("subscription", _on_subscription_event)
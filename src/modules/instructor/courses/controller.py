@@ -2,15 +2,17 @@ import asyncio
 import math
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
+from src.configs.database import SessionLocal
 from src.modules.instructor.courses.repository import CoursesRepository
 from src.modules.instructor.courses.schemas import (
     CourseListItemResponse, LectureUploadRequest, CreateCourseRequest,
     CreateCourseResponse, LectureUploadResponse, BatchLectureUploadRequest,
     BatchLectureUploadResponse, LectureUploadResult, Page)
-from src.modules.instructor.courses.utils import MuxUtils
+from src.modules.instructor.courses.utils import MuxUtils, course_catalog_cache, course_catalog_loads, upload_stage
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
-from typing import List
+from src.middlewares.etag import make_etag, etag_matches
+from typing import List, Optional, Tuple
 
 
 class CoursesController:
@@ -26,7 +28,7 @@ class CoursesController:
         video_data: LectureUploadRequest,
     ) -> LectureUploadResponse:
         """
-        Handles the full lifecycle of uploading a lecture using MuxUtils for clean separation
+        Handles the full lifecycle of uploading a lecture using MuxUtils for clean separation.
         """
         # Validate file type
         if not video.content_type or not video.content_type.startswith(
@@ -38,32 +40,36 @@ class CoursesController:
             course = self.repository.find_course_by_id(video_data.course_id)
 
             # Step 1: Create upload URL using utility function
-            upload_url, upload_id = await self.mux_utils.create_upload_url(
-                course.premium)
+            with upload_stage("create_url"):
+                upload_url, upload_id = await self.mux_utils.create_upload_url(
+                    course.premium)
 
             # Step 2: Upload video to Mux using utility function
-            await self.mux_utils.upload_video_to_mux(upload_url, video)
+            with upload_stage("upload_bytes"):
+                await self.mux_utils.upload_video_to_mux(upload_url, video)
 
             # Step 3: Wait for asset processing using utility function
-            asset_id, playback_id, duration = await self.mux_utils.wait_for_asset_processing(
-                upload_id)
+            with upload_stage("processing_wait"):
+                asset_id, playback_id, duration = await self.mux_utils.wait_for_asset_processing(
+                    upload_id)
 
             # Step 4: Generate playback url
             url = self.mux_utils.generate_playback_url(course.premium,
                                                        playback_id)
 
-            # Step 5: Save lecture to the database
-            lecture = self.repository.create_lecture(
-                video_data=video_data,
-                asset_id=asset_id,
-                playback_id=playback_id,
-                url=url,
-                duration=duration,
-            )
+            with upload_stage("db_persist"):
+                # Step 5: Save lecture to the database
+                lecture = self.repository.create_lecture(
+                    video_data=video_data,
+                    asset_id=asset_id,
+                    playback_id=playback_id,
+                    url=url,
+                    duration=duration,
+                )
 
-            # Step 6: Update the parent course
-            self.repository.update_course_data(course_id=video_data.course_id,
-                                               duration=duration)
+                # Step 6: Update the parent course
+                self.repository.update_course_data(course_id=video_data.course_id,
+                                                   duration=duration)
 
             return LectureUploadResponse(id=lecture.id,
                                          title=lecture.title,
@@ -170,25 +176,65 @@ class CoursesController:
             results=processed_results,
             course_id=videos_data.course_id)
 
-    async def get_all_courses(self, page: int,
-                              size: int) -> Page[CourseListItemResponse]:
-        """Gets all courses and formats them into a paginated response."""
-        courses, total = self.repository.get_all_courses(page, size)
+    async def get_all_courses(
+        self,
+        page: int,
+        size: int,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[Page[CourseListItemResponse]]]:
+        """
+        Gets all courses and formats them into a paginated response.
 
-        # Transform Course objects to CourseListItemResponse objects
+        Pages are served from the in-process catalog cache when possible;
+        the repository invalidates them whenever a course changes. Concurrent
+        misses for the same page share a single load. A load that races an
+        invalidation is returned to its callers but not cached, and requests
+        arriving after the invalidation start a fresh load instead of joining
+        it.
+
+        Returns the page's ETag, derived from the catalog version stamp, and
+        the page itself, or None if the client's `If-None-Match` is current.
+        """
+        generation = course_catalog_cache.generation
+        cached = course_catalog_cache.get((page, size))
+        if cached is None:
+            cached = await course_catalog_loads.do(
+                (page, size, generation),
+                lambda: asyncio.to_thread(self._load_catalog_page, page, size,
+                                          generation))
+
+        etag, response = cached
+        return etag, None if etag_matches(if_none_match, etag) else response
+
+    @staticmethod
+    def _load_catalog_page(
+            page: int, size: int,
+            generation: int) -> Tuple[str, Page[CourseListItemResponse]]:
+        # The load is shared and may outlive the request that started it, so
+        # it uses its own session rather than the request's
+        db = SessionLocal()
+        try:
+            repository = CoursesRepository(db)
+            version = repository.get_catalog_version()
+            courses = repository.get_all_courses(page, size)
+        finally:
+            db.close()
+
+        etag = make_etag("courses", page, size, version.total,
+                         version.last_modified)
+
+        # Transform course rows to CourseListItemResponse objects
         course_responses = [
-            CourseListItemResponse(id=course.id,
-                                   title=course.title,
-                                   description=course.description,
-                                   duration=course.duration,
-                                   lectures_count=course.lectures_count,
-                                   premium=course.premium,
-                                   instructor=course.instructor)
-            for course in courses
+            CourseListItemResponse.from_row(course) for course in courses
         ]
 
-        return Page(items=course_responses,
-                    total=total,
-                    page=page,
-                    size=size,
-                    pages=math.ceil(total / size) if size > 0 else 0)
+        total = version.total
+        response = Page(items=course_responses,
+                        total=total,
+                        page=page,
+                        size=size,
+                        pages=math.ceil(total / size) if size > 0 else 0)
+        course_catalog_cache.set((page, size), (etag, response),
+                                 generation=generation)
+
+        return etag, response
@@ -1,13 +1,34 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Row, func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
 from src.models.lecture import Lecture
 from src.models.course import Course
 from src.models.user import User
+from src.models.category_facet import CategoryFacet
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
+from src.configs.invalidation import invalidation_bus
+from src.modules.catalog.utils import title_index
+from .utils import invalidate_course_catalog
 from .schemas import CreateCourseRequest, CreateCourseResponse, LectureUploadRequest, LectureUploadResponse
 import uuid
 from typing import List, Tuple
 
+# Columns needed to build a `CourseListItemResponse`. Listing queries select
+# only these, so full `User` rows (password hash, date of birth, mobile
+# number) are never loaded just to render the instructor's name and email.
+COURSE_LIST_COLUMNS = (
+    Course.id,
+    Course.title,
+    Course.description,
+    Course.duration,
+    Course.lectures_count,
+    Course.premium,
+    User.first_name.label("instructor_first_name"),
+    User.last_name.label("instructor_last_name"),
+    User.email.label("instructor_email"),
+)
+
 
 class CoursesRepository:
 
@@ -17,22 +38,34 @@ class CoursesRepository:
     def find_course_by_id(self, course_id: str) -> CreateCourseResponse:
         return self.db.query(Course).filter(Course.id == course_id).first()
 
-    def get_all_courses(self, page: int, size: int) -> tuple[list[Course], int]:
+    def get_catalog_version(self) -> Row:
+        """
+        Returns the catalog's version stamp: the number of courses and the
+        latest time any course was created or updated.
+        """
+        return self.db.query(
+            func.count(Course.id).label("total"),
+            func.max(func.coalesce(Course.updated_at,
+                                   Course.created_at)).label(
+                                       "last_modified")).one()
+
+    def get_all_courses(self, page: int, size: int) -> list[Row]:
         """
-        Fetches all courses from the database with pagination.
-        Eager loads instructor details to prevent N+1 queries.
+        Fetches a page of courses from the database.
+        Joins the instructor's listing columns into the same row to prevent
+        N+1 queries without hydrating ORM objects.
         """
         if page < 1:
             page = 1
         if size < 1:
             size = 10
 
-        query = self.db.query(Course).options(joinedload(Course.instructor))
-        total = query.count()
-
-        courses = query.offset((page - 1) * size).limit(size).all()
-
-        return courses, total    
+        # A stable order keeps each course on the same page across updates,
+        # which is what lets cached pages be invalidated per course
+        return self.db.query(*COURSE_LIST_COLUMNS).join(
+            User, Course.instructor_id == User.id).order_by(
+                Course.created_at, Course.id).offset(
+                    (page - 1) * size).limit(size).all()
 
     def create_lecture(
         self,
@@ -61,6 +94,26 @@ class CoursesRepository:
                         duration=duration)
 
         self.db.add(video)
+
+        # Fold the lecture into the category facets in the same transaction
+        facet = insert(CategoryFacet).values(
+            category=video_data.category,
+            subcategory=video_data.subcategory,
+            course_id=video_data.course_id,
+            lecture_count=1,
+            total_duration=duration)
+        self.db.execute(
+            facet.on_conflict_do_update(
+                index_elements=[
+                    CategoryFacet.category, CategoryFacet.subcategory,
+                    CategoryFacet.course_id
+                ],
+                set_={
+                    "lecture_count": CategoryFacet.lecture_count + 1,
+                    "total_duration":
+                    CategoryFacet.total_duration + duration,
+                }))
+
         self.db.commit()
         self.db.refresh(video)
 
@@ -81,9 +134,19 @@ class CoursesRepository:
                            premium=course_data.premium)
 
         self.db.add(db_course)
+        invalidation_bus.publish(self.db,
+                                 "course",
+                                 db_course.id,
+                                 "created",
+                                 version=0,
+                                 title=db_course.title)
         self.db.commit()
         self.db.refresh(db_course)
 
+        # Make the new course visible in the catalog and autocomplete right away
+        invalidate_course_catalog()
+        title_index.add(db_course.id, db_course.title)
+
         return db_course
 
     def update_course_data(self, course_id: str,
@@ -114,7 +177,18 @@ class CoursesRepository:
         # Increment the number of lectures in the course
         course.lectures_count += 1
 
+        # Other workers drop their cached pages once this commits. Every
+        # course write adds a lecture under the row lock above, so the
+        # lectures count is the course's version
+        invalidation_bus.publish(self.db,
+                                 "course",
+                                 course_id,
+                                 "updated",
+                                 version=course.lectures_count)
+
         self.db.commit()
         self.db.refresh(course)
 
+        invalidate_course_catalog(course_id)
+
         return course
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, UploadFile, File, status, Form, Query, Request
+from fastapi import APIRouter, Depends, UploadFile, File, status, Form, Query, Request, Response
 from sqlalchemy.orm import Session
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
@@ -10,6 +10,7 @@ from src.modules.instructor.courses.schemas import (
     BatchLectureUploadResponse, Page, CourseListItemResponse)
 from src.modules.auth.schemas import TokenData
 from src.middlewares.auth import Auth
+from src.middlewares.etag import not_modified_response
 from src.models.user import UserRole
 from typing import List
 import json
@@ -21,10 +22,14 @@ router = APIRouter()
 @router.get("/all",
             response_model=Page[CourseListItemResponse],
             summary="Get All Courses (Paginated)",
-            description="Fetches a paginated list of all courses.")
+            description="Fetches a paginated list of all courses.",
+            responses={304: {
+                "description": "The client's cached page is current"
+            }})
 @limiter.limit("50/minute")
 async def get_all_courses(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1, description="Page number to retrieve"),
     size: int = Query(10,
@@ -32,7 +37,15 @@ async def get_all_courses(
                       le=100,
                       description="Number of courses per page")):
     controller = CoursesController(db)
-    return await controller.get_all_courses(page=page, size=size)
+    etag, courses_page = await controller.get_all_courses(
+        page=page,
+        size=size,
+        if_none_match=request.headers.get("if-none-match"))
+    if courses_page is None:
+        return not_modified_response(etag)
+
+    response.headers["ETag"] = etag
+    return courses_page
 
 
 @router.post("/add-lectures-batch",
@@ -1,4 +1,4 @@
-from typing import Optional, List, TypeVar, Generic
+from typing import Any, Optional, List, TypeVar, Generic
 from pydantic import BaseModel, Field
 
 
@@ -107,6 +107,20 @@ class CourseListItemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_row(cls, row: Any) -> "CourseListItemResponse":
+        """Builds a list item from a row selected with the course listing columns."""
+        return cls(id=row.id,
+                   title=row.title,
+                   description=row.description,
+                   duration=row.duration,
+                   lectures_count=row.lectures_count,
+                   premium=row.premium,
+                   instructor=InstructorResponse(
+                       first_name=row.instructor_first_name,
+                       last_name=row.instructor_last_name,
+                       email=row.instructor_email))
+
 
 T = TypeVar('T')
 
@@ -3,12 +3,120 @@ import asyncio
 from typing import Tuple
 from fastapi import UploadFile
 from src.configs.settings import settings
+from src.configs.cache import TTLCache
+from src.configs.single_flight import SingleFlight
+from src.configs.invalidation import invalidation_bus
+from src.configs.metrics import counter, histogram
+from src.configs.tracing import TracingTransport, tracer
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
-from jose import jwt
+from jose import jwk, jwt
+from jose.backends.base import Key
 import time
 from src.configs.settings import settings
 import base64
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Public course catalog (ETag, page) pairs keyed by (page, size)
+course_catalog_cache = TTLCache("course_catalog",
+                                max_size=settings.course_catalog_cache_size,
+                                ttl=settings.course_catalog_cache_ttl_seconds)
+
+# Concurrent cache misses for the same catalog page share one load
+course_catalog_loads = SingleFlight("course_catalog")
+
+
+def invalidate_course_catalog(course_id: str | None = None) -> None:
+    """
+    Drops cached catalog pages affected by a course change.
+
+    Without a course ID (a course was created) every page is dropped, since
+    the total changes everywhere; otherwise only the pages listing that
+    course are dropped.
+    """
+    if course_id is None:
+        course_catalog_cache.clear()
+    else:
+        course_catalog_cache.invalidate(lambda _, entry: any(
+            course.id == course_id for course in entry[1].items))
+
+
+# Course changes committed by other workers
+invalidation_bus.subscribe(
+    "course", lambda event: invalidate_course_catalog(
+        None if event.op == "created" else event.id))
+invalidation_bus.on_reset(invalidate_course_catalog)
+
+
+# Lecture upload pipeline stage latencies, from 100 ms to 10 minutes
+upload_stage_duration = histogram(
+    "lecture_upload_stage_duration_seconds",
+    "Time spent in each stage of a lecture upload", ["stage"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+mux_requests = counter("mux_requests", "Mux HTTP calls by response status",
+                       ["method", "endpoint", "status"])
+
+
+@contextmanager
+def upload_stage(stage: str) -> Iterator[None]:
+    """Times one stage of a lecture upload and traces it as a span."""
+    with upload_stage_duration.labels(stage).time(), tracer.span(
+            f"upload {stage}"):
+        yield
+
+
+def _mux_endpoint(request: httpx.Request) -> str:
+    if request.url.host == "api.mux.com":
+        # e.g. /video/v1/uploads/{id} -> uploads
+        parts = request.url.path.split("/")
+        return parts[3] if len(parts) > 3 else request.url.path
+    return "direct_upload"
+
+
+async def _record_mux_response(response: httpx.Response) -> None:
+    request = response.request
+    mux_requests.labels(request.method, _mux_endpoint(request),
+                        str(response.status_code)).inc()
+
+
+# Shared by every Mux call in this process, so connections are reused
+_http_client: Optional[httpx.AsyncClient] = None
+
+# The Mux signing key, parsed once instead of on every signed URL
+_signing_key: Optional[Key] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the process's HTTP client for Mux, creating it if needed."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=100, max_keepalive_connections=20))
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            transport=TracingTransport(
+                transport, lambda request:
+                f"mux {request.method} {_mux_endpoint(request)}"),
+            event_hooks={"response": [_record_mux_response]})
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_signing_key() -> Key:
+    """Returns the parsed Mux signing key."""
+    global _signing_key
+    if _signing_key is None:
+        _signing_key = jwk.construct(base64.b64decode(settings.mux_private_key),
+                                     "RS256")
+    return _signing_key
 
 
 class MuxUtils:
@@ -36,17 +144,16 @@ class MuxUtils:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(f"{self.base_url}/uploads",
-                                             json=create_asset_request,
-                                             auth=self.auth)
-                response.raise_for_status()
+            response = await get_http_client().post(f"{self.base_url}/uploads",
+                                                    json=create_asset_request,
+                                                    auth=self.auth)
+            response.raise_for_status()
 
-                upload_data = response.json()["data"]
-                upload_url = upload_data["url"]
-                upload_id = upload_data["id"]
+            upload_data = response.json()["data"]
+            upload_url = upload_data["url"]
+            upload_id = upload_data["id"]
 
-                return upload_url, upload_id
+            return upload_url, upload_id
 
         except httpx.HTTPStatusError as e:
             error_details = await e.response.aread() if hasattr(
@@ -75,16 +182,16 @@ class MuxUtils:
             # Reset file pointer after reading
             await video.seek(0)
 
-            async with httpx.AsyncClient(
-                    timeout=300.0) as client:  # Longer timeout for file upload
-                headers = {}
-                if video.content_type:
-                    headers['Content-Type'] = video.content_type
+            headers = {}
+            if video.content_type:
+                headers['Content-Type'] = video.content_type
 
-                upload_response = await client.put(upload_url,
-                                                   content=video_content,
-                                                   headers=headers)
-                upload_response.raise_for_status()
+            upload_response = await get_http_client().put(
+                upload_url,
+                content=video_content,
+                headers=headers,
+                timeout=300.0)  # Longer timeout for file upload
+            upload_response.raise_for_status()
 
         except httpx.HTTPStatusError as e:
             error_details = await e.response.aread() if hasattr(
@@ -116,59 +223,59 @@ class MuxUtils:
         duration = None
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                for attempt in range(max_attempts):
-                    await asyncio.sleep(5)  # Wait 5 seconds between checks
-
-                    try:
-                        # Check upload status
-                        get_upload_response = await client.get(
-                            f"{self.base_url}/uploads/{upload_id}",
+            client = get_http_client()
+            for attempt in range(max_attempts):
+                await asyncio.sleep(5)  # Wait 5 seconds between checks
+
+                try:
+                    # Check upload status
+                    get_upload_response = await client.get(
+                        f"{self.base_url}/uploads/{upload_id}",
+                        auth=self.auth)
+                    get_upload_response.raise_for_status()
+                    upload_status = get_upload_response.json()["data"]
+
+                    # Check if asset was created
+                    if (upload_status.get("status") == "asset_created"
+                            and upload_status.get("asset_id")):
+
+                        asset_id = upload_status["asset_id"]
+
+                        # Get asset details for duration and status
+                        get_asset_response = await client.get(
+                            f"{self.base_url}/assets/{asset_id}",
                             auth=self.auth)
-                        get_upload_response.raise_for_status()
-                        upload_status = get_upload_response.json()["data"]
-
-                        # Check if asset was created
-                        if (upload_status.get("status") == "asset_created"
-                                and upload_status.get("asset_id")):
-
-                            asset_id = upload_status["asset_id"]
-
-                            # Get asset details for duration and status
-                            get_asset_response = await client.get(
-                                f"{self.base_url}/assets/{asset_id}",
-                                auth=self.auth)
-                            get_asset_response.raise_for_status()
-                            asset_data = get_asset_response.json()["data"]
-
-                            # Check if asset is ready
-                            if asset_data.get("status") == "ready":
-                                duration = asset_data['tracks'][0]['duration']
-                                playback_id = asset_data["playback_ids"][0][
-                                    "id"]
-                                break
-
-                    except httpx.HTTPStatusError as e:
-                        if attempt == max_attempts - 1:  # Last attempt
-                            raise e
-                        continue  # Retry on API errors
-
-                if not asset_id:
-                    raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR,
-                                   "Mux asset processing timed out.")
-
-                if not duration:
-                    raise AppError(
-                        ErrorCodes.INTERNAL_SERVER_ERROR,
-                        "Mux asset processing completed but could not retrieve duration."
-                    )
-                if not playback_id:
-                    raise AppError(
-                        ErrorCodes.INTERNAL_SERVER_ERROR,
-                        "Mux asset processing completed but could not retrieve playback id."
-                    )
-
-                return asset_id, playback_id, duration
+                        get_asset_response.raise_for_status()
+                        asset_data = get_asset_response.json()["data"]
+
+                        # Check if asset is ready
+                        if asset_data.get("status") == "ready":
+                            duration = asset_data['tracks'][0]['duration']
+                            playback_id = asset_data["playback_ids"][0][
+                                "id"]
+                            break
+
+                except httpx.HTTPStatusError as e:
+                    if attempt == max_attempts - 1:  # Last attempt
+                        raise e
+                    continue  # Retry on API errors
+
+            if not asset_id:
+                raise AppError(ErrorCodes.INTERNAL_SERVER_ERROR,
+                               "Mux asset processing timed out.")
+
+            if not duration:
+                raise AppError(
+                    ErrorCodes.INTERNAL_SERVER_ERROR,
+                    "Mux asset processing completed but could not retrieve duration."
+                )
+            if not playback_id:
+                raise AppError(
+                    ErrorCodes.INTERNAL_SERVER_ERROR,
+                    "Mux asset processing completed but could not retrieve playback id."
+                )
+
+            return asset_id, playback_id, duration
 
         except httpx.HTTPStatusError as e:
             error_details = await e.response.aread() if hasattr(
@@ -211,13 +318,11 @@ class MuxUtils:
                 "exp": current_time + expires_in,
             }
 
-            key = base64.b64decode(settings.mux_private_key)
-
             headers = {"kid": settings.mux_signing_key_id}
 
             # Sign the JWT with Mux signing key
             token = jwt.encode(payload,
-                               key,
+                               get_signing_key(),
                                algorithm="RS256",
                                headers=headers)
 
@@ -1,10 +1,22 @@
 from sqlalchemy.orm import Session
 from src.modules.student.subscription.repository import SubscriptionRepository
-from src.modules.student.subscription.schemas import SubscriptionResponse
+from src.modules.student.subscription.schemas import (
+    SubscriptionResponse, BulkSubscriptionRequest, BulkSubscriptionResponse,
+    BulkSubscriptionResult, BulkSubscriptionStatus)
 from src.modules.instructor.courses.schemas import LectureUploadResponse
 from src.modules.instructor.courses.schemas import Page, CourseListItemResponse
+from src.configs.settings import settings
+from src.configs.database import SessionLocal
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
+from src.middlewares.etag import make_etag, etag_matches
+from src.modules.student.subscription.utils import course_lectures_loads
+from src.configs.logger import get_logger
+import asyncio
 import math
-from typing import List
+from typing import List, Optional, Tuple
+
+logger = get_logger(__name__)
 
 
 class SubscriptionController:
@@ -25,32 +37,152 @@ class SubscriptionController:
         # because `from_attributes = True` is set in the schema.
         return subscription
 
-    async def get_my_subscriptions(self, student_id: str, page: int,
-                                   size: int) -> Page[CourseListItemResponse]:
+    async def bulk_subscribe(
+            self, instructor_id: str,
+            request: BulkSubscriptionRequest) -> BulkSubscriptionResponse:
+        """
+        Enrolls every requested student into every requested course owned by
+        the instructor and reports the outcome of each (student, course) pair.
+        """
+        # Drop duplicate IDs while keeping the requested order
+        student_ids = list(dict.fromkeys(request.student_ids))
+        course_ids = list(dict.fromkeys(request.course_ids))
+
+        total = len(student_ids) * len(course_ids)
+        if total > settings.bulk_enrollment_max_pairs:
+            raise AppError(
+                ErrorCodes.BAD_REQUEST,
+                f"Bulk enrollment is limited to {settings.bulk_enrollment_max_pairs} pairs, got {total}"
+            )
+
+        batch_size = settings.bulk_enrollment_batch_size
+        students = self.repository.find_existing_students(
+            student_ids, batch_size)
+        courses = self.repository.find_instructor_courses(
+            instructor_id, course_ids)
+
+        created = self.repository.bulk_subscribe(
+            ((student_id, course_id) for course_id in course_ids
+             if course_id in courses for student_id in student_ids
+             if student_id in students), batch_size)
+
+        results: List[BulkSubscriptionResult] = []
+        counts = {status: 0 for status in BulkSubscriptionStatus}
+        for course_id in course_ids:
+            for student_id in student_ids:
+                if course_id not in courses:
+                    status = BulkSubscriptionStatus.COURSE_NOT_FOUND
+                elif student_id not in students:
+                    status = BulkSubscriptionStatus.STUDENT_NOT_FOUND
+                elif (student_id, course_id) in created:
+                    status = BulkSubscriptionStatus.SUBSCRIBED
+                else:
+                    status = BulkSubscriptionStatus.ALREADY_SUBSCRIBED
+                counts[status] += 1
+                results.append(
+                    BulkSubscriptionResult(student_id=student_id,
+                                           course_id=course_id,
+                                           status=status))
+
+        return BulkSubscriptionResponse(
+            total=total,
+            subscribed=counts[BulkSubscriptionStatus.SUBSCRIBED],
+            already_subscribed=counts[
+                BulkSubscriptionStatus.ALREADY_SUBSCRIBED],
+            failed=counts[BulkSubscriptionStatus.STUDENT_NOT_FOUND] +
+            counts[BulkSubscriptionStatus.COURSE_NOT_FOUND],
+            results=results)
+
+    async def get_my_subscriptions(
+        self,
+        student_id: str,
+        page: int,
+        size: int,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[Page[CourseListItemResponse]]]:
         """
         Gets a student's subscribed courses and formats them into a paginated response.
+
+        Returns the page's ETag, derived from the student's subscriptions
+        version stamp, and the page itself, or None if the client's
+        `If-None-Match` is current.
         """
-        courses, total = self.repository.get_subscribed_courses(
+        version = self.repository.get_subscribed_courses_version(student_id)
+        etag = make_etag("my-courses", student_id, page, size, version.total,
+                         version.last_subscribed, version.last_modified)
+        if etag_matches(if_none_match, etag):
+            return etag, None
+
+        courses = self.repository.get_subscribed_courses(
             student_id, page, size)
 
-        # The response model will automatically convert the ORM object
-        # because `from_attributes = True` is set in the schema.
         response_courses = [
-            CourseListItemResponse.model_validate(course) for course in courses
+            CourseListItemResponse.from_row(course) for course in courses
         ]
 
-        return Page(items=response_courses,
-                    total=total,
-                    page=page,
-                    size=size,
-                    pages=math.ceil(total / size) if size > 0 else 0)
+        total = version.total
+        return etag, Page(items=response_courses,
+                          total=total,
+                          page=page,
+                          size=size,
+                          pages=math.ceil(total / size) if size > 0 else 0)
 
     async def get_course_lectures(
-            self, student_id: str,
-            course_id: str) -> List[LectureUploadResponse]:
+        self,
+        student_id: str,
+        course_id: str,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[List[LectureUploadResponse]]]:
         """
         Handles the business logic for fetching lectures of a subscribed course.
+
+        The subscription is checked per request with a cheap `EXISTS`, while
+        concurrent requests for the same course, by any students, share one
+        lecture load.
+
+        Returns the list's ETag, derived from the lecture IDs and modification
+        times, and the lectures, or None if the client's `If-None-Match` is
+        current.
         """
-        lectures = self.repository.get_lectures_for_subscribed_course(
-            student_id, course_id)
-        return lectures #type: ignore
+        if not self.repository.is_subscribed(student_id, course_id):
+            logger.info("Lecture access denied",
+                        extra={
+                            "student_id": student_id,
+                            "course_id": course_id
+                        })
+            raise AppError(
+                ErrorCodes.PERMISSION_NOT_GRANTED,
+                "Access denied. You are not subscribed to this course.")
+
+        etag, lectures = await course_lectures_loads.do(
+            course_id,
+            lambda: asyncio.to_thread(self._load_course_lectures, course_id))
+
+        return etag, None if etag_matches(if_none_match, etag) else lectures
+
+    @staticmethod
+    def _load_course_lectures(
+            course_id: str) -> Tuple[str, List[LectureUploadResponse]]:
+        # The load is shared and may outlive the request that started it, so
+        # it uses its own session rather than the request's
+        db = SessionLocal()
+        try:
+            lectures = SubscriptionRepository(db).get_course_lectures(
+                course_id)
+        finally:
+            db.close()
+
+        logger.debug("Fetched course lectures",
+                     extra={
+                         "course_id": course_id,
+                         "lectures_count": len(lectures)
+                     })
+
+        etag = make_etag("lectures", course_id,
+                         [(lecture.id, lecture.modified_at)
+                          for lecture in lectures])
+
+        return etag, [
+            LectureUploadResponse.model_validate(lecture)
+            for lecture in lectures
+        ]
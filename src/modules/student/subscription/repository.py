@@ -1,12 +1,26 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Row, exists, func, select
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
+from psycopg2.errorcodes import FOREIGN_KEY_VIOLATION
 from src.models.subscription import Subscription
 from src.models.course import Course
 from src.models.lecture import Lecture
+from src.models.user import User, UserRole
+from src.modules.instructor.courses.repository import COURSE_LIST_COLUMNS
+from src.configs.invalidation import invalidation_bus
+from src.modules.catalog.utils import title_index
 from src.errors.app_errors import AppError
 from src.errors.error_codes import ErrorCodes
 import uuid
-from typing import List
+from collections import Counter
+from typing import Iterable, List, Set, Tuple
+
+# Subscription errors for the foreign keys Postgres names by default
+FOREIGN_KEY_ERRORS = {
+    "subscriptions_course_id_fkey": "Course not found.",
+    "subscriptions_student_id_fkey": "Student not found.",
+}
 
 
 class SubscriptionRepository:
@@ -19,34 +33,34 @@ class SubscriptionRepository:
                             course_id: str) -> Subscription:
         """
         Creates a subscription record in the database for a student and a course.
-        """
-        # 1. Check if the course exists
-        course = self.db.query(Course).filter(Course.id == course_id).first()
-        if not course:
-            raise AppError(ErrorCodes.NOT_FOUND, "Course not found.")
-
-        # 2. Check if the student is already subscribed
-        existing_subscription = self.db.query(Subscription).filter(
-            Subscription.student_id == student_id,
-            Subscription.course_id == course_id).first()
-
-        if existing_subscription:
-            raise AppError(ErrorCodes.BAD_REQUEST,
-                           "You are already subscribed to this course.")
 
-        # 3. Create the new subscription
-        new_subscription = Subscription(id=str(uuid.uuid4()),
-                                        student_id=student_id,
-                                        course_id=course_id)
+        Runs as a single statement: an `INSERT ... ON CONFLICT DO NOTHING
+        RETURNING` in a CTE, selected together with the cache invalidation
+        event, which is only queued if a row was inserted. The violated
+        foreign key tells whether the course or the student does not exist,
+        and an empty result means the student is already subscribed.
+        """
+        inserted = insert(Subscription).values(
+            id=str(uuid.uuid4()), student_id=student_id,
+            course_id=course_id).on_conflict_do_nothing(
+                index_elements=[Subscription.student_id,
+                                Subscription.course_id]).returning(
+                                    *Subscription.__table__.c).cte("inserted")
+        stmt = select(
+            aliased(Subscription, inserted),
+            invalidation_bus.notification("subscription",
+                                          course_id,
+                                          "created",
+                                          count=1))
         try:
-            self.db.add(new_subscription)
+            new_subscription = self.db.scalars(stmt).first()
             self.db.commit()
-            self.db.refresh(new_subscription)
-            return new_subscription
-        except IntegrityError:
-            # This is a fallback in case of a race condition
-            # The unique constraint in the model will raise this error
+        except IntegrityError as e:
             self.db.rollback()
+            diag = getattr(e.orig, "diag", None)
+            message = FOREIGN_KEY_ERRORS.get(getattr(diag, "constraint_name", None))
+            if getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION and message:
+                raise AppError(ErrorCodes.NOT_FOUND, message)
             raise AppError(
                 ErrorCodes.BAD_REQUEST,
                 "Subscription failed. You may already be subscribed.")
@@ -57,48 +71,146 @@ class SubscriptionRepository:
                 f"Could not process subscription due to an unexpected error: {e}"
             )
 
+        if not new_subscription:
+            raise AppError(ErrorCodes.BAD_REQUEST,
+                           "You are already subscribed to this course.")
+
+        title_index.increment(course_id)
+
+        return new_subscription
+
+    def get_subscribed_courses_version(self, student_id: str) -> Row:
+        """
+        Returns the version stamp of a student's subscribed courses: how many
+        there are and the latest time a subscription was created or one of
+        the subscribed courses was created or updated.
+        """
+        return self.db.query(
+            func.count(Subscription.id).label("total"),
+            func.max(Subscription.created_at).label("last_subscribed"),
+            func.max(func.coalesce(
+                Course.updated_at,
+                Course.created_at)).label("last_modified")).select_from(
+                    Subscription).join(
+                        Course, Subscription.course_id == Course.id).filter(
+                            Subscription.student_id == student_id).one()
+
     def get_subscribed_courses(self, student_id: str, page: int,
-                               size: int) -> tuple[list[Course], int]:
+                               size: int) -> list[Row]:
         """
-        Fetches all courses a student is subscribed to, with pagination.
+        Fetches a page of the courses a student is subscribed to.
         """
         if page < 1:
             page = 1
         if size < 1:
             size = 10
 
-        # First, get the total count of subscribed courses for pagination
-        total = self.db.query(Subscription).filter(
-            Subscription.student_id == student_id).count()
-
-        # Then, get the paginated list of courses by joining through the subscription table
-        courses = self.db.query(Course).join(Subscription).filter(
-            Subscription.student_id == student_id).options(
-                joinedload(
-                    Course.instructor)  # Eager load to prevent N+1 queries
-            ).offset((page - 1) * size).limit(size).all()
-
-        return courses, total
+        # Get the paginated list of courses by joining through the subscription table,
+        # selecting only the listing columns of the course and its instructor
+        return self.db.query(*COURSE_LIST_COLUMNS).select_from(
+            Subscription).join(
+                Course, Subscription.course_id == Course.id).join(
+                    User, Course.instructor_id == User.id).filter(
+                        Subscription.student_id == student_id).order_by(
+                            Subscription.created_at, Subscription.id).offset(
+                                (page - 1) * size).limit(size).all()
+
+    def is_subscribed(self, student_id: str, course_id: str) -> bool:
+        """Checks whether a student is subscribed to a course."""
+        return self.db.query(
+            exists().where(Subscription.student_id == student_id,
+                           Subscription.course_id == course_id)).scalar()
+
+    def get_course_lectures(self, course_id: str) -> List[Row]:
+        """
+        Fetches all lectures of a course, ordered by creation time.
 
-    def get_lectures_for_subscribed_course(self, student_id: str,
-                                           course_id: str) -> List[Lecture]:
+        Only the columns needed by `LectureUploadResponse` are loaded, plus
+        each lecture's modification time for the list's ETag. The result
+        does not depend on the student, so concurrent requests for the same
+        course can share it.
+        """
+        return self.db.query(
+            Lecture.id, Lecture.title, Lecture.description, Lecture.asset_id,
+            Lecture.playback_id, Lecture.url, Lecture.duration,
+            Lecture.category, Lecture.subcategory, Lecture.course_id,
+            func.coalesce(Lecture.updated_at, Lecture.created_at).label(
+                "modified_at")).filter(Lecture.course_id == course_id).order_by(
+                    Lecture.created_at).all()
+
+    def find_existing_students(self, student_ids: List[str],
+                               batch_size: int) -> Set[str]:
         """
-        Verifies a student's subscription and fetches all lectures for that course.
+        Returns the subset of the given IDs that belong to student accounts.
         """
-        print(f"Course id: {course_id}, Student id: {student_id}")
+        existing: Set[str] = set()
+        for i in range(0, len(student_ids), batch_size):
+            batch = student_ids[i:i + batch_size]
+            rows = self.db.query(User.id).filter(
+                User.id.in_(batch), User.role == UserRole.STUDENT).all()
+            existing.update(row.id for row in rows)
+        return existing
+
+    def find_instructor_courses(self, instructor_id: str,
+                                course_ids: List[str]) -> Set[str]:
+        """
+        Returns the subset of the given course IDs owned by the instructor.
+        """
+        rows = self.db.query(Course.id).filter(
+            Course.id.in_(course_ids),
+            Course.instructor_id == instructor_id).all()
+        return {row.id for row in rows}
 
-        # 1. Verify that the student is subscribed to the course.
-        subscription = self.db.query(Subscription).filter(
-            Subscription.student_id == student_id,
-            Subscription.course_id == course_id).first()
+    def bulk_subscribe(self, pairs: Iterable[Tuple[str, str]],
+                       batch_size: int) -> Set[Tuple[str, str]]:
+        """
+        Inserts (student_id, course_id) subscriptions in multi-row batches.
 
-        if not subscription:
+        Pairs that already exist are skipped by `ON CONFLICT DO NOTHING`, so
+        the returned set only contains the subscriptions that were created.
+        All batches are committed in a single transaction.
+        """
+        created: Set[Tuple[str, str]] = set()
+        batch: List[dict] = []
+        try:
+            for student_id, course_id in pairs:
+                batch.append({
+                    "id": str(uuid.uuid4()),
+                    "student_id": student_id,
+                    "course_id": course_id
+                })
+                if len(batch) >= batch_size:
+                    created.update(self._insert_subscriptions(batch))
+                    batch = []
+            if batch:
+                created.update(self._insert_subscriptions(batch))
+            subscribers_by_course = Counter(course_id
+                                            for _, course_id in created)
+            for course_id, subscribers in subscribers_by_course.items():
+                invalidation_bus.publish(self.db,
+                                         "subscription",
+                                         course_id,
+                                         "created",
+                                         count=subscribers)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
             raise AppError(
-                ErrorCodes.PERMISSION_NOT_GRANTED,
-                "Access denied. You are not subscribed to this course.")
+                ErrorCodes.INTERNAL_SERVER_ERROR,
+                f"Could not process bulk enrollment due to an unexpected error: {e}"
+            )
+
+        for course_id, subscribers in subscribers_by_course.items():
+            title_index.increment(course_id, subscribers)
 
-        # 2. If subscribed, fetch all lectures associated with the course.
-        lectures = self.db.query(Lecture).filter(
-            Lecture.course_id == course_id).order_by(Lecture.created_at).all()
+        return created
 
-        return lectures
+    def _insert_subscriptions(self,
+                              rows: List[dict]) -> Set[Tuple[str, str]]:
+        stmt = insert(Subscription).values(rows).on_conflict_do_nothing(
+            index_elements=[Subscription.student_id,
+                            Subscription.course_id]).returning(
+                                Subscription.student_id,
+                                Subscription.course_id)
+        return {(row.student_id, row.course_id)
+                for row in self.db.execute(stmt)}
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, status, Query, Request
+from fastapi import APIRouter, Depends, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from src.configs.database import get_db
 from src.modules.student.subscription.controller import SubscriptionController
-from src.modules.student.subscription.schemas import SubscriptionRequest, SubscriptionResponse
+from src.modules.student.subscription.schemas import SubscriptionRequest, SubscriptionResponse, BulkSubscriptionRequest, BulkSubscriptionResponse
 from src.modules.instructor.courses.schemas import Page, CourseListItemResponse, LectureUploadResponse
 from src.modules.auth.schemas import TokenData
 from src.middlewares.auth import Auth
+from src.middlewares.etag import not_modified_response
 from src.models.user import UserRole
 from typing import List
 from src.configs.limiter import limiter
@@ -37,23 +38,63 @@ async def subscribe_to_course(request_body: SubscriptionRequest,
         student_id=current_user.sub, course_id=request_body.course_id)
 
 
+@router.post(
+    "/bulk",
+    response_model=BulkSubscriptionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Bulk Enroll Students",
+    description=
+    "Allows an instructor to enroll a cohort of students into several of their courses at once."
+)
+@limiter.limit("5/minute")
+async def bulk_subscribe(request_body: BulkSubscriptionRequest,
+                         request: Request,
+                         db: Session = Depends(get_db),
+                         current_user: TokenData = Depends(
+                             Auth(UserRole.INSTRUCTOR))):
+    """
+    Enrolls every listed student into every listed course.
+
+    - **student_ids**: The IDs of the students to enroll.
+    - **course_ids**: The IDs of the courses, all owned by the instructor.
+
+    Returns the outcome of each (student, course) pair. Pairs that are
+    already subscribed are reported and left unchanged.
+
+    This endpoint is only accessible by users with the 'INSTRUCTOR' role.
+    """
+    controller = SubscriptionController(db)
+    return await controller.bulk_subscribe(instructor_id=current_user.sub,
+                                           request=request_body)
+
+
 @router.get(
     "/my-courses/{course_id}/lectures",
     response_model=List[LectureUploadResponse],
     summary="Get Lectures for a Subscribed Course",
     description=
-    "Fetches all lectures for a specific course that the authenticated student is subscribed to."
-)
+    "Fetches all lectures for a specific course that the authenticated student is subscribed to.",
+    responses={304: {
+        "description": "The client's cached lecture list is current"
+    }})
 @limiter.limit("50/minute")
 async def get_subscribed_course_lectures(
         request: Request,
+        response: Response,
         course_id: str,
         db: Session = Depends(get_db),
         current_user: TokenData = Depends(Auth(UserRole.STUDENT)),
 ):
     controller = SubscriptionController(db)
-    return await controller.get_course_lectures(student_id=current_user.sub,
-                                                course_id=course_id)
+    etag, lectures = await controller.get_course_lectures(
+        student_id=current_user.sub,
+        course_id=course_id,
+        if_none_match=request.headers.get("if-none-match"))
+    if lectures is None:
+        return not_modified_response(etag)
+
+    response.headers["ETag"] = etag
+    return lectures
 
 
 @router.get(
@@ -61,11 +102,14 @@ async def get_subscribed_course_lectures(
     response_model=Page[CourseListItemResponse],
     summary="Get My Subscribed Courses",
     description=
-    "Fetches a paginated list of courses the authenticated student is subscribed to."
-)
+    "Fetches a paginated list of courses the authenticated student is subscribed to.",
+    responses={304: {
+        "description": "The client's cached page is current"
+    }})
 @limiter.limit("50/minute")
 async def get_my_subscribed_courses(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(Auth(UserRole.STUDENT)),
     page: int = Query(1, ge=1, description="Page number to retrieve"),
@@ -74,6 +118,13 @@ async def get_my_subscribed_courses(
                       le=100,
                       description="Number of courses per page")):
     controller = SubscriptionController(db)
-    return await controller.get_my_subscriptions(student_id=current_user.sub,
-                                                 page=page,
-                                                 size=size)
+    etag, courses_page = await controller.get_my_subscriptions(
+        student_id=current_user.sub,
+        page=page,
+        size=size,
+        if_none_match=request.headers.get("if-none-match"))
+    if courses_page is None:
+        return not_modified_response(etag)
+
+    response.headers["ETag"] = etag
+    return courses_page
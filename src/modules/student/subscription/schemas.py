@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from enum import Enum
+from typing import List
 
 
 class SubscriptionRequest(BaseModel):
@@ -16,4 +18,45 @@ class SubscriptionResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BulkSubscriptionStatus(str, Enum):
+    """Outcome of a single (student, course) pair in a bulk enrollment."""
+    SUBSCRIBED = "subscribed"
+    ALREADY_SUBSCRIBED = "already_subscribed"
+    STUDENT_NOT_FOUND = "student_not_found"
+    COURSE_NOT_FOUND = "course_not_found"
+
+
+class BulkSubscriptionRequest(BaseModel):
+    """Schema for enrolling every listed student into every listed course."""
+    student_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        description="The IDs of the students to enroll.")
+    course_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        description="The IDs of the courses to enroll the students into.")
+
+
+class BulkSubscriptionResult(BaseModel):
+    """Schema for the outcome of a single (student, course) pair."""
+    student_id: str
+    course_id: str
+    status: BulkSubscriptionStatus
+
+
+class BulkSubscriptionResponse(BaseModel):
+    """Schema for the response after a bulk enrollment."""
+    total: int = Field(..., description="The number of pairs processed.")
+    subscribed: int = Field(
+        ..., description="The number of newly created subscriptions.")
+    already_subscribed: int = Field(
+        ..., description="The number of pairs that were already subscribed.")
+    failed: int = Field(
+        ...,
+        description="The number of pairs rejected because the student or course was not found."
+    )
+    results: List[BulkSubscriptionResult] = Field(
+        ..., description="The outcome of every (student, course) pair.")
@@ -0,0 +1,4 @@
+from src.configs.single_flight import SingleFlight
+
+# Concurrent lecture list loads of the same course share one query
+course_lectures_loads = SingleFlight("course_lectures")
@@ -0,0 +1,181 @@
+import os
+import random
+import signal
+import socket
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+
+from src.configs.logger import get_logger
+from src.configs.metrics import registry
+from src.configs.settings import settings
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ServerOptions:
+    host: str = settings.host
+    port: int = settings.port
+    workers: int = settings.server_workers or (os.cpu_count() or 1)
+    backlog: int = settings.server_backlog
+    keep_alive: int = settings.server_keep_alive_seconds
+    limit_concurrency: Optional[int] = settings.server_limit_concurrency or None
+    max_requests: int = settings.server_max_requests
+    max_requests_jitter: int = settings.server_max_requests_jitter
+
+
+class Supervisor:
+    """
+    Pre-fork process manager for production.
+
+    The parent imports the app once and binds the listening socket, then
+    forks workers that inherit both and each run their own event loop. A
+    worker that exits, e.g. after reaching its request limit, is replaced.
+    SIGTERM and SIGINT stop every worker gracefully; SIGHUP replaces them.
+    """
+
+    def __init__(self, options: ServerOptions):
+        self.options = options
+        self.workers: Dict[int, Tuple[int, float]] = {}  # pid -> (number, start time)
+        self.stopping = False
+
+    def run(self) -> None:
+        # Preload: every worker starts from the already imported app
+        from src.app import app
+        from src.configs.hashing import password_hasher
+
+        # Settle the hashing cost once, so every worker hashes alike, and
+        # split the hashing budget between the workers
+        password_hasher.calibrate_in_process()
+        password_hasher.share(self.options.workers)
+
+        self.socket = self._bind()
+        registry.snapshot_dir = self._metrics_dir()
+        logger.info("Starting server",
+                    extra={
+                        "address": f"{self.options.host}:{self.options.port}",
+                        "workers": self.options.workers
+                    })
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+
+        for number in range(self.options.workers):
+            self._spawn(app, number)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            # Keep its counts in one file rather than one file per lifetime
+            try:
+                registry.retire_snapshots(pid)
+            except Exception:
+                logger.exception("Failed to fold the worker's metrics",
+                                 extra={"pid": pid})
+            if self.stopping:
+                continue
+            number, started_at = worker
+            logger.info("Replacing worker",
+                        extra={
+                            "pid": pid,
+                            "exit_code": os.waitstatus_to_exitcode(status)
+                        })
+            # Don't spin if workers die right after starting
+            if time.monotonic() - started_at < 1.0:
+                time.sleep(1.0)
+            self._spawn(app, number)
+
+        self.socket.close()
+        logger.info("Server stopped")
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.options.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.options.host, self.options.port))
+        sock.listen(self.options.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _metrics_dir(self) -> str:
+        # Workers write their samples here so any of them can serve /metrics
+        path = settings.metrics_dir or tempfile.mkdtemp(prefix="metrics-")
+        os.makedirs(path, exist_ok=True)
+        for file_name in os.listdir(path):
+            if file_name.endswith(".json"):
+                os.remove(os.path.join(path, file_name))
+        return path
+
+    def _spawn(self, app, number: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = (number, time.monotonic())
+            return
+
+        # Worker process
+        code = 0
+        try:
+            self._run_worker(app)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _run_worker(self, app) -> None:
+        from src.configs.database import engine
+
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+
+        # Connections inherited from the parent belong to it; the worker
+        # opens its own pool (and its own Mux client, in the app lifespan)
+        engine.dispose(close=False)
+
+        max_requests = None
+        if self.options.max_requests:
+            max_requests = self.options.max_requests + random.randint(
+                0, self.options.max_requests_jitter)
+
+        config = uvicorn.Config(
+            app,
+            loop="uvloop",
+            http="httptools",
+            lifespan="on",
+            backlog=self.options.backlog,
+            timeout_keep_alive=self.options.keep_alive,
+            limit_concurrency=self.options.limit_concurrency or None,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=int(settings.shutdown_drain_seconds),
+            log_config=None,
+            access_log=False)
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def _signal_workers(self, signum: int) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        self._signal_workers(signal.SIGTERM)
+
+    def _reload(self, signum, frame) -> None:
+        # Workers exit gracefully and the wait loop replaces them
+        self._signal_workers(signal.SIGTERM)
+
+
+def serve(options: ServerOptions) -> None:
+    Supervisor(options).run()
@@ -0,0 +1,179 @@
+"""
+Subscription throughput: the original three round trip path (check the
+course, check for an existing subscription, then insert and refresh)
+against `SubscriptionRepository.subscribe_to_course`.
+
+Needs the same PostgreSQL database as the tests:
+
+    TEST_DATABASE_URL=postgresql://... python -m tests.benchmark_subscribe --students 2000 --concurrency 8
+
+Each run seeds an instructor, a course and the students, subscribes every
+student once with each implementation, and deletes its rows afterwards.
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List
+
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import src.app  # noqa: F401  (registers every model)
+from src.configs.database import Base, SessionLocal, engine
+from src.errors.app_errors import AppError
+from src.errors.error_codes import ErrorCodes
+from src.models.course import Course
+from src.models.subscription import Subscription
+from src.models.user import User, UserRole
+from src.modules.student.subscription.repository import SubscriptionRepository
+
+
+def subscribe_three_round_trips(db: Session, student_id: str,
+                                course_id: str) -> Subscription:
+    """The implementation `subscribe_to_course` replaced, kept as a baseline."""
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course:
+        raise AppError(ErrorCodes.NOT_FOUND, "Course not found.")
+
+    existing_subscription = db.query(Subscription).filter(
+        Subscription.student_id == student_id,
+        Subscription.course_id == course_id).first()
+    if existing_subscription:
+        raise AppError(ErrorCodes.BAD_REQUEST,
+                       "You are already subscribed to this course.")
+
+    new_subscription = Subscription(id=str(uuid.uuid4()),
+                                    student_id=student_id,
+                                    course_id=course_id)
+    db.add(new_subscription)
+    db.commit()
+    db.refresh(new_subscription)
+    return new_subscription
+
+
+def subscribe_single_statement(db: Session, student_id: str,
+                               course_id: str) -> Subscription:
+    return SubscriptionRepository(db).subscribe_to_course(student_id, course_id)
+
+
+def _seed(students: int) -> tuple[str, List[str]]:
+    db = SessionLocal()
+    try:
+        instructor = User(id=str(uuid.uuid4()),
+                          first_name="Bench",
+                          last_name="Instructor",
+                          email=f"{uuid.uuid4()}@example.com",
+                          password="x" * 60,
+                          date_of_birth=datetime(1990, 1, 1),
+                          mobile_number=uuid.uuid4().hex[:15],
+                          role=UserRole.INSTRUCTOR)
+        db.add(instructor)
+        db.flush()
+        student_ids = [str(uuid.uuid4()) for _ in range(students)]
+        db.bulk_insert_mappings(User, [{
+            "id": student_id,
+            "first_name": "Bench",
+            "last_name": "Student",
+            "email": f"{student_id}@example.com",
+            "password": "x" * 60,
+            "date_of_birth": datetime(1990, 1, 1),
+            "mobile_number": student_id.replace("-", "")[:15],
+            "role": UserRole.STUDENT,
+        } for student_id in student_ids])
+        db.commit()
+        return instructor.id, student_ids
+    finally:
+        db.close()
+
+
+def _new_course(instructor_id: str) -> str:
+    db = SessionLocal()
+    try:
+        course = Course(id=str(uuid.uuid4()),
+                        instructor_id=instructor_id,
+                        title="Subscription Benchmark",
+                        description="Seeded by the subscription benchmark")
+        db.add(course)
+        db.commit()
+        return course.id
+    finally:
+        db.close()
+
+
+def _cleanup(instructor_id: str, student_ids: List[str]) -> None:
+    db = SessionLocal()
+    try:
+        # Courses and subscriptions go with them (ON DELETE CASCADE)
+        db.query(Course).filter(Course.instructor_id == instructor_id).delete(
+            synchronize_session=False)
+        db.query(User).filter(User.id.in_(student_ids +
+                                          [instructor_id])).delete(
+                                              synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run(name: str, subscribe: Callable[[Session, str, str], Subscription],
+         course_id: str, student_ids: List[str], concurrency: int) -> None:
+    statements = 0
+    lock = threading.Lock()
+
+    def count(*_):
+        nonlocal statements
+        with lock:
+            statements += 1
+
+    def one(student_id: str) -> None:
+        db = SessionLocal()
+        try:
+            subscribe(db, student_id, course_id)
+        finally:
+            db.close()
+
+    event.listen(engine, "after_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(one, student_ids))
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "after_cursor_execute", count)
+
+    print(f"{name:<22} {len(student_ids) / elapsed:>10.0f} subscriptions/s "
+          f"{elapsed / len(student_ids) * 1000 * concurrency:>8.2f} ms each "
+          f"{statements / len(student_ids):>6.1f} statements each")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare subscription throughput before and after the "
+        "single statement subscribe")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    instructor_id, student_ids = _seed(args.students)
+    try:
+        # Warm the pool so neither run pays for opening connections
+        _run("warm-up", subscribe_single_statement,
+             _new_course(instructor_id), student_ids[:args.concurrency],
+             args.concurrency)
+        _run("three round trips", subscribe_three_round_trips,
+             _new_course(instructor_id), student_ids, args.concurrency)
+        _run("single statement", subscribe_single_statement,
+             _new_course(instructor_id), student_ids, args.concurrency)
+    finally:
+        _cleanup(instructor_id, student_ids)
+
+
+if __name__ == "__main__":
+    main()
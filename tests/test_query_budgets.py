@@ -0,0 +1,108 @@
+"""
+Query budgets for the hottest endpoints, so that an N+1 query or a lost
+batch fails the build instead of showing up in production latency.
+"""
+import uuid
+
+from src.middlewares.auth import verify_token
+from src.middlewares.query_stats import assert_query_budget
+from src.models.user import UserRole
+from src.modules.instructor.courses.utils import course_catalog_cache
+
+
+def test_catalog_page_does_not_query_per_course(client, seed):
+    instructor = seed.user(UserRole.INSTRUCTOR)
+    for _ in range(5):
+        seed.lecture(seed.course(instructor))
+    course_catalog_cache.clear()
+
+    # The catalog version (count and last change) and the page itself
+    with assert_query_budget(2) as recorded:
+        response = client.get("/api/v1/course/all", params={"size": 5})
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 5
+    assert len(recorded) == 1
+
+
+def test_course_lectures_do_not_query_per_lecture(client, seed):
+    instructor = seed.user(UserRole.INSTRUCTOR)
+    student = seed.user(UserRole.STUDENT)
+    course = seed.course(instructor)
+    for _ in range(5):
+        seed.lecture(course)
+    seed.subscription(student, course)
+
+    # The subscription check and the course's shared lecture load
+    with assert_query_budget(2) as recorded:
+        response = client.get(
+            f"/api/v1/subscribe/my-courses/{course.id}/lectures",
+            headers=seed.auth_headers(student))
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert len(recorded) == 1
+
+
+def test_course_lectures_rejects_unsubscribed_student_in_one_query(
+        client, seed):
+    instructor = seed.user(UserRole.INSTRUCTOR)
+    student = seed.user(UserRole.STUDENT)
+    course = seed.course(instructor)
+    seed.lecture(course)
+
+    # Rejected by the subscription check, before any lecture load
+    with assert_query_budget(1) as recorded:
+        response = client.get(
+            f"/api/v1/subscribe/my-courses/{course.id}/lectures",
+            headers=seed.auth_headers(student))
+
+    assert response.status_code == 403
+    assert len(recorded) == 1
+
+
+def test_bulk_subscribe_does_not_query_per_student(client, seed):
+    instructor = seed.user(UserRole.INSTRUCTOR)
+    students = [seed.user(UserRole.STUDENT) for _ in range(20)]
+    courses = [seed.course(instructor) for _ in range(2)]
+    seed.subscription(students[0], courses[0])
+
+    # Student and course lookups, one batched insert, and one cache
+    # invalidation event per course
+    with assert_query_budget(2 + 1 + len(courses)) as recorded:
+        response = client.post(
+            "/api/v1/subscribe/bulk",
+            json={
+                "student_ids": [student.id for student in students],
+                "course_ids": [course.id for course in courses],
+            },
+            headers=seed.auth_headers(instructor))
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["subscribed"] == 39
+    assert body["already_subscribed"] == 1
+    assert len(recorded) == 1
+
+
+def test_register_creates_user_and_refresh_token_in_one_transaction(
+        client, seed):
+    email = f"register-{uuid.uuid4()}@example.com"
+
+    # The user and refresh token inserts, committed together
+    with assert_query_budget(2) as recorded:
+        response = client.post(
+            "/api/v1/auth/register",
+            json={
+                "first_name": "Test",
+                "last_name": "Student",
+                "email": email,
+                "password": "Secure_password123",
+                "date_of_birth": "1990-01-01",
+                "mobile_number": uuid.uuid4().hex[:15],
+                "role": "student",
+            })
+
+    assert response.status_code == 201
+    seed.user_ids.append(verify_token(response.json()["token"]).sub)
+    assert len(recorded) == 1